@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from typing import Any
+import hashlib
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts: Any) -> str:
+    """Build a strong ETag from the values that determine a response body."""
+    digest = hashlib.blake2s(repr(parts).encode("utf-8"), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as recommended for If-None-Match
+    candidates = {c.strip().removeprefix("W/") for c in header.split(",")}
+    return etag in candidates
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
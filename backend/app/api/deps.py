@@ -1,5 +1,6 @@
 from typing import Generator
 from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 
@@ -7,6 +8,10 @@ from ..core.config import settings
 from ..core.security import verify_password
 from ..db.session import get_db
 from ..db.models import User
+from ..services.auth_cache import UserSnapshot, get_auth_cache
+
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_PREFIX}/auth/login")
 
 
 def get_db_dep() -> Generator[Session, None, None]:
@@ -14,21 +19,30 @@ def get_db_dep() -> Generator[Session, None, None]:
 
 
 def get_current_user(
-    token: str, db: Session
-):
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        sub: str = payload.get("sub")  # type: ignore
-        if sub is None:
-            raise JWTError("Invalid token")
-    except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    user = db.query(User).filter(User.email == sub).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+) -> UserSnapshot:
+    # Tokens verified earlier skip decoding; users seen recently skip the DB
+    cache = get_auth_cache()
+    sub = cache.get_token(token)
+    if sub is None:
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            sub: str = payload.get("sub")  # type: ignore
+            if sub is None:
+                raise JWTError("Invalid token")
+        except JWTError:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        cache.set_token(token, sub, payload.get("exp"))
 
+    user = cache.users.get(sub)
+    if user is None:
+        row = db.query(User.id, User.email, User.preferences).filter(User.email == sub).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="User not found")
+        user = UserSnapshot(id=row.id, email=row.email, preferences=row.preferences)
+        cache.users.set(sub, user)
+    return user
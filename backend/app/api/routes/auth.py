@@ -1,44 +1,96 @@
 from datetime import timedelta
+import time
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...core.config import settings
-from ...core.security import create_access_token, get_password_hash, verify_password
-from ...db.session import get_db
+from ...core.metrics import LatencyStats
+from ...core.security import create_access_token
+from ...db.session import get_async_db
 from ...db.models import User
 from ...schemas.user import UserCreate, UserOut
 from ...schemas.auth import Token
+from ...services.auth_cache import invalidate_user
+from ...services.password_hasher import HasherBusy, get_password_hasher
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+_latency = {"signup": LatencyStats(), "login": LatencyStats()}
+
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is busy, retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
 
 @router.post("/signup", response_model=UserOut)
-def signup(payload: UserCreate, db: Session = Depends(get_db)):
-    existing = db.query(User).filter(User.email == payload.email).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    user = User(email=payload.email, hashed_password=get_password_hash(payload.password))
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+async def signup(payload: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    started = time.monotonic()
+    try:
+        existing = await db.scalar(select(User.id).where(User.email == payload.email))
+        if existing:
+            raise HTTPException(status_code=400, detail="Email already registered")
+        try:
+            hashed = await get_password_hasher().hash(payload.password)
+        except HasherBusy:
+            raise _busy()
+        user = User(email=payload.email, hashed_password=hashed)
+        db.add(user)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Lost a race with a concurrent signup for the same email
+            await db.rollback()
+            raise HTTPException(status_code=400, detail="Email already registered")
+        invalidate_user(user.email)
+        return user
+    finally:
+        _latency["signup"].observe(time.monotonic() - started)
 
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect email or password",
-            headers={"WWW-Authenticate": "Bearer"},
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    started = time.monotonic()
+    try:
+        row = (
+            await db.execute(select(User.id, User.hashed_password).where(User.email == form_data.username))
+        ).first()
+        ok, new_hash = False, None
+        if row:
+            try:
+                ok, new_hash = await get_password_hasher().verify_and_update(form_data.password, row.hashed_password)
+            except HasherBusy:
+                raise _busy()
+        if not ok:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Incorrect email or password",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        if new_hash is not None:
+            # Stored hash used an outdated cost factor; upgrade it transparently
+            await db.execute(update(User).where(User.id == row.id).values(hashed_password=new_hash))
+            await db.commit()
+
+        access_token = create_access_token(
+            subject=form_data.username,
+            expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
         )
+        return Token(access_token=access_token)
+    finally:
+        _latency["login"].observe(time.monotonic() - started)
 
-    access_token = create_access_token(
-        subject=user.email,
-        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
-    )
-    return Token(access_token=access_token)
 
+@router.get("/metrics")
+def auth_metrics():
+    return {
+        "hasher": get_password_hasher().stats(),
+        "latency": {name: stats.snapshot() for name, stats in _latency.items()},
+    }
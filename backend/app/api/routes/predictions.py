@@ -1,19 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+import asyncio
 import traceback
+from datetime import datetime, timezone
 from pydantic import BaseModel, Field
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import List, Optional
 
-from ...db.session import get_db
-from ...services.historical import backfill_historical, loc_key_from_latlon
+from ...core.config import settings
+from ...db.session import get_async_db, get_db
+from ..conditional import etag_matches, make_etag, not_modified
+from ...services.locations import loc_key_from_latlon
 from ...db.models import HistoricalWeather, Prediction, ModelRegistry
-from ...services.trainer_daily import train_daily
-from ...services.trainer_hourly import train_hourly
-from ...celery_app import celery_app
+from ...services.prediction_store import (
+    current_prediction_windows,
+    select_current_predictions,
+    select_current_run_id,
+)
+from ...services.forecast_cache import get_forecast_cache
+from ...services.history_export import arrow_stream, iter_history_chunks, ndjson_stream
 
 
 router = APIRouter(prefix="/predictions", tags=["predictions"])
 
+# Trainers, historical backfill (meteostat/pandas), numpy and the Celery app
+# are imported inside the handlers that use them so API startup stays light.
+
 
 class BackfillRequest(BaseModel):
     lat: float
@@ -24,6 +38,8 @@ class BackfillRequest(BaseModel):
 
 @router.post("/backfill")
 def backfill(req: BackfillRequest, db: Session = Depends(get_db)):
+    from ...services.historical import backfill_historical
+
     try:
         inserted = backfill_historical(db, lat=req.lat, lon=req.lon, months=req.months)
         key = loc_key_from_latlon(req.lat, req.lon)
@@ -45,34 +61,110 @@ class PredictionsQuery(BaseModel):
     lat: float
     lon: float
     horizon: str = Field(pattern="^(hourly|daily)$")
-    window: Optional[int] = None  # hours for hourly, days for daily
+    # hours for hourly, days for daily; PredictionsQuery is also the /batch item schema
+    window: Optional[int] = Field(default=None, ge=1, le=24 * 31)
+
+
+def _window_limit(horizon: str, window: Optional[int]) -> int:
+    if horizon == "hourly":
+        return window or 48
+    return window or 7
+
+
+def _prediction_out(p) -> dict:
+    # ts stays a datetime; ORJSONResponse serializes it natively
+    return {
+        "ts": p.ts,
+        "yhat": p.yhat,
+        "yhat_lower": p.yhat_lower,
+        "yhat_upper": p.yhat_upper,
+        "ensemble": bool(p.ensemble),
+        "model_versions": p.model_versions,
+    }
 
 
 @router.post("")
-def get_predictions(req: PredictionsQuery, db: Session = Depends(get_db)):
+async def get_predictions(req: PredictionsQuery, request: Request, db: AsyncSession = Depends(get_async_db)):
     key = loc_key_from_latlon(req.lat, req.lon)
-    if req.horizon == "hourly":
-        limit = req.window or 48
-    else:
-        limit = req.window or 7
-    q = (
-        db.query(Prediction)
-        .filter(Prediction.loc_key == key, Prediction.horizon == req.horizon)
-        .order_by(Prediction.ts.asc())
-        .limit(limit)
-        .all()
-    )
-    return [
-        {
-            "ts": p.ts.isoformat() if hasattr(p.ts, "isoformat") else str(p.ts),
-            "yhat": p.yhat,
-            "yhat_lower": p.yhat_lower,
-            "yhat_upper": p.yhat_upper,
-            "ensemble": bool(p.ensemble),
-            "model_versions": p.model_versions,
-        }
-        for p in q
-    ]
+    limit = _window_limit(req.horizon, req.window)
+    cache = get_forecast_cache()
+    generation, cached = await cache.alookup(key, req.horizon, limit)
+    if cached is not None:
+        if etag_matches(request, cached["etag"]):
+            return not_modified(cached["etag"])
+        return ORJSONResponse(cached["items"], headers={"ETag": cached["etag"]})
+    if request.headers.get("if-none-match"):
+        # The ETag only depends on the current run, so a revalidation can be
+        # answered from the pointer alone; the client already holds its rows
+        run_id = (await db.execute(select_current_run_id(key=key, horizon=req.horizon))).scalar()
+        etag = make_etag("predictions", key, req.horizon, limit, run_id)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+    # Pointer and rows in one statement so a flip plus GC in between cannot
+    # yield an empty window under the old run's ETag
+    rows = (
+        await db.execute(
+            select_current_predictions(key=key, horizon=req.horizon)
+            .order_by(Prediction.ts.asc())
+            .limit(limit)
+        )
+    ).scalars().all()
+    run_id = rows[0].run_id if rows else None
+    etag = make_etag("predictions", key, req.horizon, limit, run_id)
+    out = [_prediction_out(p) for p in rows]
+    if out:
+        # Empty windows are not cached: a location may be mid-flip or not trained yet
+        await cache.aset(key, req.horizon, limit, {"etag": etag, "items": out}, generation=generation)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return ORJSONResponse(out, headers={"ETag": etag})
+
+
+class BatchPredictionsQuery(BaseModel):
+    items: List[PredictionsQuery] = Field(min_length=1, max_length=200)
+
+
+@router.post("/batch")
+def get_predictions_batch(req: BatchPredictionsQuery, db: Session = Depends(get_db)):
+    """Resolve many (lat, lon, horizon, window) lookups in one round trip.
+
+    Cached windows are served directly; the rest are fetched with a single
+    ranked query. Results are grouped per loc_key.
+    """
+    cache = get_forecast_cache()
+    resolved: dict[tuple[str, str, int], list] = {}
+    misses: dict[tuple[str, str, int], Optional[int]] = {}
+    for item in req.items:
+        key = loc_key_from_latlon(item.lat, item.lon)
+        limit = _window_limit(item.horizon, item.window)
+        wkey = (key, item.horizon, limit)
+        if wkey in resolved or wkey in misses:
+            continue
+        generation, cached = cache.lookup(*wkey)
+        if cached is not None:
+            resolved[wkey] = cached["items"]
+        else:
+            misses[wkey] = generation
+
+    if misses:
+        rows = current_prediction_windows(db, misses.keys())
+        for (key, horizon, limit), generation in misses.items():
+            window_rows = rows.get((key, horizon), [])[:limit]
+            out = [_prediction_out(p) for p in window_rows]
+            run_id = window_rows[0].run_id if window_rows else None
+            if out:
+                etag = make_etag("predictions", key, horizon, limit, run_id)
+                cache.set(key, horizon, limit, {"etag": etag, "items": out}, generation=generation)
+            resolved[(key, horizon, limit)] = out
+
+    results: dict[str, list] = {}
+    for item in req.items:
+        key = loc_key_from_latlon(item.lat, item.lon)
+        limit = _window_limit(item.horizon, item.window)
+        results.setdefault(key, []).append(
+            {"horizon": item.horizon, "window": limit, "items": resolved[(key, item.horizon, limit)]}
+        )
+    return ORJSONResponse({"results": results})
 
 
 class TrainRequest(BaseModel):
@@ -87,8 +179,12 @@ class TrainRequest(BaseModel):
 def train(req: TrainRequest, db: Session = Depends(get_db)):
     try:
         if req.horizon == "daily":
+            from ...services.trainer_daily import train_daily
+
             inserted = train_daily(db, lat=req.lat, lon=req.lon, days=req.days)
         else:
+            from ...services.trainer_hourly import train_hourly
+
             inserted = train_hourly(db, lat=req.lat, lon=req.lon, hours=req.hours)
         key = loc_key_from_latlon(req.lat, req.lon)
         return {"status": "ok", "loc_key": key, "inserted": inserted, "horizon": req.horizon}
@@ -97,26 +193,128 @@ def train(req: TrainRequest, db: Session = Depends(get_db)):
 
 
 
+def _series_points(rows, max_points: Optional[int], method: str) -> list[dict]:
+    if max_points is not None and len(rows) > max_points:
+        import numpy as np
+
+        from ...services.downsample import downsample
+
+        ts = np.array([r.ts for r in rows], dtype="datetime64[s]").astype(np.int64)
+        temps = np.fromiter((r.temp_c for r in rows), dtype=np.float64, count=len(rows))
+        rows = [rows[i] for i in downsample(ts, temps, max_points, method=method)]
+    return [{"ts": r.ts, "temp_c": r.temp_c} for r in rows]
+
+
 @router.get("/historical_series")
-def historical_series(lat: float, lon: float, hours: int = 48, db: Session = Depends(get_db)):
+async def historical_series(
+    lat: float,
+    lon: float,
+    request: Request,
+    hours: int = Query(default=48, ge=1, le=settings.HISTORICAL_SERIES_MAX_ROWS),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    max_points: Optional[int] = Query(default=None, ge=3, le=10000),
+    method: str = Query(default="lttb", pattern="^(lttb|minmax)$"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Temperature series for charts.
+
+    Without ``start``/``end`` the last ``hours`` observations are returned.
+    With a range, all observations in ``[start, end]`` are used, at most
+    ``HISTORICAL_SERIES_MAX_ROWS`` of them, downsampled to
+    ``HISTORICAL_SERIES_DEFAULT_POINTS`` unless ``max_points`` is given.
+    ``max_points`` downsamples the result server-side (LTTB or per-bucket
+    min/max) in a worker thread.
+    """
+    if start is not None and end is not None and end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    # Stored timestamps are naive UTC
+    if start is not None and start.tzinfo is not None:
+        start = start.astimezone(timezone.utc).replace(tzinfo=None)
+    if end is not None and end.tzinfo is not None:
+        end = end.astimezone(timezone.utc).replace(tzinfo=None)
+    ranged = start is not None or end is not None
+    if ranged and max_points is None:
+        max_points = settings.HISTORICAL_SERIES_DEFAULT_POINTS
+
     key = loc_key_from_latlon(lat, lon)
-    q = (
-        db.query(HistoricalWeather)
-        .filter(HistoricalWeather.loc_key == key)
-        .order_by(HistoricalWeather.ts.desc())
-        .limit(max(1, hours))
-        .all()
+    # High-water mark: newest timestamp plus row count catches appends and gap fills
+    last_ts, total = (
+        await db.execute(
+            select(func.max(HistoricalWeather.ts), func.count(HistoricalWeather.id))
+            .where(HistoricalWeather.loc_key == key)
+        )
+    ).one()
+    etag = make_etag(
+        "historical_series", key, hours, str(start), str(end), max_points, method, str(last_ts), total
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    q = select(HistoricalWeather.ts, HistoricalWeather.temp_c).where(
+        HistoricalWeather.loc_key == key, HistoricalWeather.temp_c.is_not(None)
+    )
+    if not ranged:
+        rows = (await db.execute(q.order_by(HistoricalWeather.ts.desc()).limit(hours))).all()
+        rows.reverse()
+    else:
+        if start is not None:
+            q = q.where(HistoricalWeather.ts >= start)
+        if end is not None:
+            q = q.where(HistoricalWeather.ts <= end)
+        cap = settings.HISTORICAL_SERIES_MAX_ROWS
+        rows = (await db.execute(q.order_by(HistoricalWeather.ts.asc()).limit(cap + 1))).all()
+        if len(rows) > cap:
+            raise HTTPException(
+                status_code=400, detail=f"Range covers more than {cap} observations; narrow start/end"
+            )
+
+    series = await asyncio.to_thread(_series_points, rows, max_points, method)
+    return ORJSONResponse(series, headers={"ETag": etag})
+
+@router.get("/historical_export")
+def historical_export(
+    lat: float,
+    lon: float,
+    format: str = Query(default="ndjson", pattern="^(ndjson|arrow)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+):
+    """Stream the full historical_weather series for a location."""
+    key = loc_key_from_latlon(lat, lon)
+    if start is not None and start.tzinfo is not None:
+        start = start.astimezone(timezone.utc).replace(tzinfo=None)
+    if end is not None and end.tzinfo is not None:
+        end = end.astimezone(timezone.utc).replace(tzinfo=None)
+    chunks = iter_history_chunks(key, start=start, end=end)
+    filename = f"history_{key.replace(',', '_')}"
+    if format == "arrow":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Arrow export requires pyarrow")
+        return StreamingResponse(
+            arrow_stream(chunks),
+            media_type="application/vnd.apache.arrow.stream",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.arrows"'},
+        )
+    return StreamingResponse(
+        ndjson_stream(chunks),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}.ndjson"'},
     )
-    series = [
-        {"ts": r.ts.isoformat() if hasattr(r.ts, "isoformat") else str(r.ts), "temp_c": r.temp_c}
-        for r in reversed(q)
-        if r.temp_c is not None
-    ]
-    return series
 
 @router.get("/metrics")
-def metrics(lat: float, lon: float, db: Session = Depends(get_db)):
+def metrics(lat: float, lon: float, request: Request, response: Response, db: Session = Depends(get_db)):
     key = loc_key_from_latlon(lat, lon)
+    last_id, total = (
+        db.query(func.max(ModelRegistry.id), func.count(ModelRegistry.id))
+        .filter(ModelRegistry.loc_key == key)
+        .one()
+    )
+    etag = make_etag("metrics", key, last_id, total)
+    if etag_matches(request, etag):
+        return not_modified(etag)
     regs = db.query(ModelRegistry).filter(ModelRegistry.loc_key == key).order_by(ModelRegistry.trained_at.desc()).all()
     out = [
         {
@@ -127,6 +325,7 @@ def metrics(lat: float, lon: float, db: Session = Depends(get_db)):
         }
         for r in regs
     ]
+    response.headers["ETag"] = etag
     return {"loc_key": key, "models": out}
 
 
@@ -141,6 +340,8 @@ class TrainAsyncRequest(BaseModel):
 
 @router.post("/train_async")
 def train_async(req: TrainAsyncRequest):
+    from ...celery_app import celery_app
+
     if req.horizon == "daily":
         model = req.model or "prophet"
         async_result = celery_app.send_task(
@@ -160,6 +361,8 @@ def train_async(req: TrainAsyncRequest):
 
 @router.get("/status")
 def status(id: str):
+    from ...celery_app import celery_app
+
     res = celery_app.AsyncResult(id)
     out = {"id": id, "state": res.state}
     if res.successful():
@@ -173,14 +376,25 @@ def status(id: str):
 
 
 @router.get("/available")
-def available(lat: float, lon: float, horizon: str, db: Session = Depends(get_db)):
+async def available(lat: float, lon: float, horizon: str, db: AsyncSession = Depends(get_async_db)):
     key = loc_key_from_latlon(lat, lon)
-    q = db.query(Prediction).filter(Prediction.loc_key == key, Prediction.horizon == horizon).count()
+    run_id = select_current_run_id(key=key, horizon=horizon).scalar_subquery()
+    q = (
+        await db.execute(
+            select(func.count(Prediction.id)).where(
+                Prediction.loc_key == key,
+                Prediction.horizon == horizon,
+                Prediction.run_id == run_id,
+            )
+        )
+    ).scalar_one()
     return {"loc_key": key, "horizon": horizon, "count": int(q)}
 
 
 @router.get("/health")
 def worker_health():
+    from ...celery_app import celery_app
+
     try:
         res = celery_app.control.ping(timeout=2.0)
         worker_up = bool(res)
@@ -1,38 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from ...db.session import get_db
-from ...db.models import Activity
+from ...db.session import get_async_db, get_db
 from ...schemas.recommend import (
     ActivityOut,
+    BatchFeedbackRequest,
+    BatchRecommendationRequest,
+    BatchRecommendationResponse,
     RecommendationRequest,
     RecommendationResult,
+    TimelineResponse,
     FeedbackRequest,
 )
-from ...services.recommender import recommend, update_preference
+from ...services.activity_catalog import cached_activity_catalog, get_activity_catalog
+from ...core.config import settings
+from ...services.preference_buffer import get_preference_buffer
+from ...services.recommender import (
+    apply_ratings,
+    fold_ratings,
+    recommend,
+    recommend_batch,
+    recommend_timeline,
+    update_preference,
+)
 
 
 router = APIRouter(prefix="/recommendations", tags=["recommendations"])
 
 
 @router.get("/activities", response_model=List[ActivityOut])
-def list_activities(db: Session = Depends(get_db)):
-    acts = db.query(Activity).all()
-    return [ActivityOut(key=a.key, label=a.label, tags=a.tags or []) for a in acts]
+async def list_activities(db: AsyncSession = Depends(get_async_db)):
+    catalog = cached_activity_catalog() or await db.run_sync(get_activity_catalog)
+    return [ActivityOut(key=a.key, label=a.label, tags=list(a.tags)) for a in catalog.activities]
 
 
 @router.post("/activities", response_model=List[RecommendationResult])
-def recommend_activities(payload: RecommendationRequest, db: Session = Depends(get_db)):
-    results = recommend(
-        db,
-        user_id=payload.user_id,
-        units=payload.units,
-        temperature=payload.temperature,
-        humidity=payload.humidity,
-        wind_speed=payload.wind_speed,
-        condition=payload.condition,
-        top_k=payload.top_k,
+async def recommend_activities(payload: RecommendationRequest, db: AsyncSession = Depends(get_async_db)):
+    # The scoring service is sync; run_sync drives it over the async connection
+    results = await db.run_sync(
+        lambda session: recommend(
+            session,
+            user_id=payload.user_id,
+            units=payload.units,
+            temperature=payload.temperature,
+            humidity=payload.humidity,
+            wind_speed=payload.wind_speed,
+            condition=payload.condition,
+            top_k=payload.top_k,
+        )
     )
     return [
         RecommendationResult(key=k, label=label, score=round(score, 3), reason=reason)
@@ -40,8 +57,90 @@ def recommend_activities(payload: RecommendationRequest, db: Session = Depends(g
     ]
 
 
+@router.post("/batch", response_model=BatchRecommendationResponse)
+async def recommend_activities_batch(payload: BatchRecommendationRequest, db: AsyncSession = Depends(get_async_db)):
+    """Top-k activities for many (user, weather) scenarios in one call."""
+    results = await db.run_sync(
+        lambda session: recommend_batch(session, scenarios=payload.scenarios, top_k=payload.top_k)
+    )
+    return BatchRecommendationResponse(
+        results=[
+            [
+                RecommendationResult(key=k, label=label, score=round(score, 3), reason=reason)
+                for (k, label, score, reason) in rows
+            ]
+            for rows in results
+        ]
+    )
+
+
+@router.get("/timeline", response_model=TimelineResponse)
+async def recommendation_timeline(
+    loc_key: str,
+    horizon: str = Query("hourly", pattern="^(hourly|daily)$"),
+    user_id: Optional[int] = None,
+    units: str = "metric",
+    humidity: Optional[float] = None,
+    wind_speed: Optional[float] = None,
+    condition: Optional[str] = None,
+    min_score: float = 0.5,
+    min_steps: int = Query(1, ge=1),
+    max_windows: int = Query(3, ge=1, le=20),
+    top_k: int = Query(5, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Best time windows per activity over the stored forecast for ``loc_key``."""
+    try:
+        return await db.run_sync(
+            lambda session: recommend_timeline(
+                session,
+                key=loc_key,
+                horizon=horizon,
+                user_id=user_id,
+                units=units,
+                humidity=humidity,
+                wind_speed=wind_speed,
+                condition=condition,
+                min_score=min_score,
+                min_steps=min_steps,
+                max_windows=max_windows,
+                top_k=top_k,
+            )
+        )
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
 @router.post("/feedback")
 def submit_feedback(payload: FeedbackRequest, db: Session = Depends(get_db)):
+    if settings.PREFERENCE_BUFFER_ENABLED and get_preference_buffer().add(
+        payload.user_id, payload.activity_key, payload.rating
+    ):
+        return {"status": "queued", "activity_key": payload.activity_key}
     pref = update_preference(db, user_id=payload.user_id, activity_key=payload.activity_key, rating=payload.rating)
     return {"status": "ok", "activity_key": pref.activity_key, "score": pref.score}
 
+
+@router.post("/feedback/batch")
+def submit_feedback_batch(payload: BatchFeedbackRequest, db: Session = Depends(get_db)):
+    """Apply many ratings in order; repeated (user, activity) pairs are folded into one upsert."""
+    if settings.PREFERENCE_BUFFER_ENABLED:
+        buffer = get_preference_buffer()
+        leftover = [i for i in payload.items if not buffer.add(i.user_id, i.activity_key, i.rating)]
+    else:
+        leftover = payload.items
+    folds = fold_ratings((i.user_id, i.activity_key, i.rating) for i in leftover)
+    updated = apply_ratings(db, folds)
+    return {
+        "status": "ok",
+        "received": len(payload.items),
+        "queued": len(payload.items) - len(leftover),
+        "updated": updated,
+    }
+
+
+@router.get("/feedback/metrics")
+def feedback_metrics():
+    return get_preference_buffer().stats()
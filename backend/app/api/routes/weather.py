@@ -1,13 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
+import httpx
+import orjson
 
-from ...db.session import get_db
-from ...db.models import WeatherData
-from ...schemas.weather import WeatherIngest, WeatherOut
+from ...core.config import settings
+from ...db.session import get_async_db, get_db
+from ...db.models import LatestWeather, WeatherData
+from ...schemas.weather import WeatherIngest, WeatherOut, BulkIngestResult
+from ...services.weather_ingest import bulk_insert_observations, upsert_latest
+from ...services.ingest_buffer import BufferFull, get_ingest_buffer
+from ...services.raw_payloads import load_raw_payload, store_raw_payloads
+from ...services.current_weather_cache import get_current_weather
 
 router = APIRouter(prefix="/weather", tags=["weather"])
 
+_ingest_batch = TypeAdapter(List[WeatherIngest])
+
 
 @router.post("/ingest", response_model=WeatherOut)
 def ingest_weather(payload: WeatherIngest, db: Session = Depends(get_db)):
@@ -19,19 +31,113 @@ def ingest_weather(payload: WeatherIngest, db: Session = Depends(get_db)):
         humidity=payload.humidity,
         pressure=payload.pressure,
         weather_condition=payload.weather_condition,
-        raw_data=payload.raw_data,
     )
     db.add(entry)
+    db.flush()
+    store_raw_payloads(db, [(entry.id, payload.raw_data)])
+    upsert_latest(
+        db,
+        [{**payload.model_dump(exclude={"raw_data"}), "id": entry.id, "timestamp": entry.timestamp}],
+    )
     db.commit()
     db.refresh(entry)
     return entry
 
 
+async def _parse_ingest_body(request: Request) -> List[WeatherIngest]:
+    """Validate a JSON array or NDJSON body of observations in one pass."""
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+            items = [orjson.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = orjson.loads(body)
+    except orjson.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array or NDJSON body")
+    if len(items) > settings.INGEST_MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {settings.INGEST_MAX_BATCH} observations per request")
+    try:
+        return _ingest_batch.validate_python(items)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+
+
+@router.post("/ingest/bulk", response_model=BulkIngestResult)
+async def ingest_weather_bulk(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Ingest many observations from a JSON array or an NDJSON body."""
+    records = await _parse_ingest_body(request)
+    inserted = await db.run_sync(bulk_insert_observations, records)
+    return BulkIngestResult(received=len(records), inserted=inserted)
+
+
+@router.post("/ingest/buffered", status_code=202)
+async def ingest_weather_buffered(request: Request):
+    """Queue observations for a batched write-behind flush and return immediately."""
+    records = await _parse_ingest_body(request)
+    try:
+        await get_ingest_buffer().put_many(records, timeout=settings.INGEST_BUFFER_PUT_TIMEOUT)
+    except BufferFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    return {"accepted": len(records)}
+
+
+@router.get("/ingest/metrics")
+def ingest_metrics():
+    return get_ingest_buffer().stats()
+
+
+@router.get("/current")
+async def current_weather(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    units: str = Query("metric", pattern="^(standard|metric|imperial)$"),
+):
+    """Current conditions from OpenWeather, cached per ~1 km cell."""
+    try:
+        return await get_current_weather(lat, lon, units)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Upstream weather provider error: {e}")
+
+
 @router.get("/latest", response_model=List[WeatherOut])
-def latest_weather(location_name: str | None = None, db: Session = Depends(get_db)):
-    q = db.query(WeatherData)
+async def latest_weather(
+    location_name: str | None = None,
+    all_locations: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Recent observations, or with ``all_locations`` the newest one per location."""
+    if all_locations:
+        rows = (
+            await db.execute(select(LatestWeather).order_by(LatestWeather.location_name))
+        ).scalars().all()
+        return [
+            WeatherOut(
+                id=r.weather_id,
+                location_name=r.location_name,
+                latitude=r.latitude,
+                longitude=r.longitude,
+                temperature=r.temperature,
+                humidity=r.humidity,
+                pressure=r.pressure,
+                weather_condition=r.weather_condition,
+            )
+            for r in rows
+        ]
+    q = select(WeatherData)
     if location_name:
-        q = q.filter(WeatherData.location_name == location_name)
+        q = q.where(WeatherData.location_name == location_name)
     q = q.order_by(WeatherData.timestamp.desc())
-    return q.limit(10).all()
+    return (await db.execute(q.limit(10))).scalars().all()
+
 
+@router.get("/{weather_id}/raw")
+async def raw_weather_payload(weather_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Provider payload for one observation, decompressed on request."""
+    raw = await db.run_sync(load_raw_payload, weather_id)
+    if raw is None:
+        raise HTTPException(status_code=404, detail="No raw payload for this observation")
+    return raw
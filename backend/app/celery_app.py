@@ -26,6 +26,17 @@ celery_app.conf.update(
             "task": "app.tasks.predictions.maintenance",
             "schedule": crontab(minute=0, hour=3),
         },
+        # Drop superseded prediction runs
+        "predictions-gc-runs": {
+            "task": "app.tasks.predictions.gc_runs",
+            "schedule": crontab(minute="*/15"),
+        },
+        # Append live observations for tracked locations; the second poll
+        # of the hour fills in locations the first one missed
+        "weather-collect-history": {
+            "task": "app.tasks.weather.collect_tracked_history",
+            "schedule": crontab(minute="5,35"),
+        },
     },
 )
 
@@ -13,6 +13,12 @@ class Settings(BaseSettings):
     SECRET_KEY: str = Field(default="dev-secret-change", env="SECRET_KEY")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 24h
     ALGORITHM: str = "HS256"
+    AUTH_TOKEN_CACHE_TTL: float = 300.0  # seconds a verified token skips decoding
+    AUTH_USER_CACHE_TTL: float = 60.0  # seconds a user snapshot skips the DB
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    BCRYPT_ROUNDS: int = 12  # stored hashes with other costs are re-hashed on login
+    PASSWORD_HASH_WORKERS: int = 2  # dedicated bcrypt threads
+    PASSWORD_HASH_MAX_PENDING: int = 32  # running + queued before shedding with 503
 
     # Database (default sqlite for local dev; override to Postgres via env)
     DATABASE_URL: str = Field(
@@ -23,6 +29,70 @@ class Settings(BaseSettings):
     OPENWEATHER_API_KEY: str | None = Field(default=None, env="OPENWEATHER_API_KEY")
     REDIS_URL: str = Field(default="redis://localhost:6379/0", env="REDIS_URL")
 
+    # OpenWeather HTTP client (one pooled client per process)
+    OPENWEATHER_BASE_URL: str = "https://api.openweathermap.org"
+    OPENWEATHER_TIMEOUT: float = 15.0  # seconds
+    OPENWEATHER_CONNECT_TIMEOUT: float = 5.0
+    OPENWEATHER_MAX_CONNECTIONS: int = 20
+    OPENWEATHER_MAX_KEEPALIVE: int = 10
+    OPENWEATHER_KEEPALIVE_EXPIRY: float = 30.0
+    OPENWEATHER_HTTP2: bool = False  # needs the h2 package (httpx[http2])
+
+    # Batch collection: token bucket shared by all worker processes (via Redis)
+    OPENWEATHER_RATE_PER_SEC: float = 1.0  # free tier allows 60 calls/minute; total across workers
+    OPENWEATHER_RATE_LIMIT_REDIS: bool = True  # share the bucket via REDIS_URL; False makes the rate per process
+    OPENWEATHER_RATE_BURST: int = 10
+    OPENWEATHER_BATCH_CONCURRENCY: int = 10
+
+    # Current-weather lookup cache, keyed by rounded (lat, lon, units)
+    OPENWEATHER_CACHE_TTL: float = 600.0  # provider refreshes roughly every 10 min
+    OPENWEATHER_CACHE_PRECISION: int = 2  # decimal places, ~1 km
+    OPENWEATHER_CACHE_MAX_ENTRIES: int = 4096
+    OPENWEATHER_CACHE_REDIS: bool = False
+
+    # Live history collection (beat task appending to historical_weather)
+    HISTORY_COLLECT_MAX_LOCATIONS: int = 500
+    HISTORY_FRESH_HOURS: int = 6  # skip archive backfill when live rows are this recent
+
+    # Recommender
+    ACTIVITY_CATALOG_TTL: float = 300.0  # seconds before the compiled catalog is reloaded
+    PREFERENCE_CACHE_TTL: float = 60.0  # without Redis, how long other workers may serve stale vectors
+    PREFERENCE_CACHE_MAX_ENTRIES: int = 4096  # users
+    PREFERENCE_CACHE_REDIS: bool = False  # share per-user generations via REDIS_URL so writes invalidate all workers
+    PREFERENCE_BUFFER_ENABLED: bool = False  # coalesce feedback in memory before writing
+    PREFERENCE_BUFFER_FLUSH_INTERVAL: float = 2.0  # seconds
+    PREFERENCE_BUFFER_MAX_PENDING: int = 10000  # distinct (user, activity) pairs
+    PREFERENCE_BUFFER_MAX_ATTEMPTS: int = 8  # flush attempts per pair before it is dropped
+    PREFERENCE_BUFFER_RETRY_BACKOFF: float = 0.5  # seconds, doubled per failed attempt (capped at 30)
+
+    # historical_series limits
+    HISTORICAL_SERIES_MAX_ROWS: int = 24 * 366 * 2  # rows one request may read (~2 years hourly)
+    HISTORICAL_SERIES_DEFAULT_POINTS: int = 2000  # max_points applied to range queries by default
+
+    # Forecast read cache (in-process tier, optional shared Redis tier)
+    FORECAST_CACHE_LOCAL_TTL: float = 30.0  # seconds; without Redis, how long worker-written sets may lag
+    FORECAST_CACHE_MAX_ENTRIES: int = 2048
+    FORECAST_CACHE_REDIS: bool = False
+    FORECAST_CACHE_REDIS_TTL: int = 3600  # seconds
+
+    # Weather ingest
+    INGEST_MAX_BATCH: int = 5000  # observations per bulk request
+    INGEST_BUFFER_MAX_BATCH: int = 500  # rows per write-behind flush
+    INGEST_BUFFER_FLUSH_INTERVAL: float = 1.0  # seconds
+    INGEST_BUFFER_MAX_PENDING: int = 20000
+    INGEST_BUFFER_PUT_TIMEOUT: float = 0.5  # seconds to wait for space
+    INGEST_BUFFER_MAX_ATTEMPTS: int = 8  # flush attempts per record before it is dropped
+    INGEST_BUFFER_RETRY_BACKOFF: float = 0.5  # seconds, doubled per failed attempt (capped at 30)
+
+    # Raw provider payloads (side table, compressed)
+    RAW_PAYLOAD_CODEC: str = "zstd"  # 'zstd' (falls back to gzip if unavailable) | 'gzip'
+    RAW_PAYLOAD_ZSTD_LEVEL: int = 3
+    RAW_PAYLOAD_ZSTD_DICT: str | None = None  # path to a trained zstd dictionary
+
+    # Response compression (gzip, or brotli when brotli-asgi is installed)
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # bytes
+    COMPRESSION_LEVEL: int = 6
+
     # CORS
     CORS_ALLOW_ORIGINS: List[str] = Field(
         default_factory=lambda: [
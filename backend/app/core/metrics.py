@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from collections import deque
+from threading import Lock
+
+
+class LatencyStats:
+    """Running latency summary with percentiles over a recent window."""
+
+    def __init__(self, window: int = 1024):
+        self._recent: deque[float] = deque(maxlen=window)
+        self._lock = Lock()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._recent.append(seconds)
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            recent = sorted(self._recent)
+            count, total, peak = self.count, self.total, self.max
+
+        def _pct(p: float) -> float:
+            if not recent:
+                return 0.0
+            return recent[min(len(recent) - 1, int(p * len(recent)))] * 1e3
+
+        return {
+            "count": count,
+            "mean_ms": (total / count * 1e3) if count else 0.0,
+            "p50_ms": _pct(0.50),
+            "p95_ms": _pct(0.95),
+            "max_ms": peak * 1e3,
+        }
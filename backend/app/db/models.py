@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, Float, func, Index
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Float, func, Index, UniqueConstraint, LargeBinary, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .session import Base
@@ -26,7 +26,44 @@ class WeatherData(Base):
     humidity: Mapped[float | None] = mapped_column(Float)
     pressure: Mapped[float | None] = mapped_column(Float)
     weather_condition: Mapped[str | None] = mapped_column(String(100))
-    raw_data: Mapped[dict | None] = mapped_column(JSON)
+    # Legacy inline payloads; new ones go to WeatherRawPayload. Deferred so
+    # regular queries never read it.
+    raw_data: Mapped[dict | None] = mapped_column(JSON, deferred=True)
+
+    # Fetch server-generated timestamp on flush (RETURNING) instead of a later SELECT
+    __mapper_args__ = {"eager_defaults": True}
+
+
+Index("ix_weather_loc_ts", WeatherData.location_name, WeatherData.timestamp)
+
+
+class WeatherRawPayload(Base):
+    """Compressed provider payload for a weather_data row, loaded on demand."""
+
+    __tablename__ = "weather_raw_payloads"
+
+    weather_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("weather_data.id", ondelete="CASCADE"), primary_key=True
+    )
+    codec: Mapped[str] = mapped_column(String(32), nullable=False)  # 'gzip' | 'zstd' | 'zstd:<dict id>'
+    raw_size: Mapped[int] = mapped_column(Integer, nullable=False)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+
+class LatestWeather(Base):
+    """Most recent observation per location, upserted on ingest."""
+
+    __tablename__ = "latest_weather"
+
+    location_name: Mapped[str] = mapped_column(String(255), primary_key=True)
+    weather_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    latitude: Mapped[float | None] = mapped_column(Float)
+    longitude: Mapped[float | None] = mapped_column(Float)
+    timestamp: Mapped[str] = mapped_column(DateTime(timezone=True), nullable=False)
+    temperature: Mapped[float | None] = mapped_column(Float)
+    humidity: Mapped[float | None] = mapped_column(Float)
+    pressure: Mapped[float | None] = mapped_column(Float)
+    weather_condition: Mapped[str | None] = mapped_column(String(100))
 
 
 class Activity(Base):
@@ -54,6 +91,10 @@ class UserPreference(Base):
     updated_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
 
+# One row per (user, activity); target of the EMA upsert in update_preference
+Index("uq_user_pref_user_activity", UserPreference.user_id, UserPreference.activity_key, unique=True)
+
+
 class HistoricalWeather(Base):
     __tablename__ = "historical_weather"
 
@@ -70,6 +111,8 @@ class HistoricalWeather(Base):
 
 # Composite indexes for faster queries
 Index("ix_hist_loc_ts", HistoricalWeather.loc_key, HistoricalWeather.ts)
+# One observation per (location, hour); backfill and live collection insert with ON CONFLICT DO NOTHING
+Index("uq_hist_loc_ts", HistoricalWeather.loc_key, HistoricalWeather.ts, unique=True)
 
 
 class ModelRegistry(Base):
@@ -96,8 +139,38 @@ class Prediction(Base):
     yhat_upper: Mapped[float | None] = mapped_column(Float)
     ensemble: Mapped[bool] = mapped_column(Integer, default=1)  # 1/0
     model_versions: Mapped[dict | None] = mapped_column(JSON, default=None)
+    # Prediction set this row belongs to; only the run referenced by
+    # PredictionRun is visible to readers.
+    run_id: Mapped[str | None] = mapped_column(String(32), index=True)
     created_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
 
 # Composite indexes for predictions
 Index("ix_pred_loc_hor_ts", Prediction.loc_key, Prediction.horizon, Prediction.ts)
+Index("ix_pred_run_ts", Prediction.run_id, Prediction.ts)
+
+
+class PredictionRun(Base):
+    """Pointer to the current prediction set for a (loc_key, horizon)."""
+
+    __tablename__ = "prediction_runs"
+    __table_args__ = (UniqueConstraint("loc_key", "horizon", name="uq_pred_run_loc_hor"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    loc_key: Mapped[str] = mapped_column(String(64))
+    horizon: Mapped[str] = mapped_column(String(16))  # 'hourly' | 'daily'
+    run_id: Mapped[str] = mapped_column(String(32), nullable=False)
+    updated_at: Mapped[str] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+class SupersededPredictionRun(Base):
+    """When a run stopped being current; ``prune_stale_runs`` measures its grace from here."""
+
+    __tablename__ = "superseded_prediction_runs"
+
+    run_id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    loc_key: Mapped[str] = mapped_column(String(64))
+    horizon: Mapped[str] = mapped_column(String(16))
+    superseded_at: Mapped[str] = mapped_column(DateTime(timezone=True), server_default=func.now(), index=True)
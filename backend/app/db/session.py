@@ -1,4 +1,5 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
 from ..core.config import settings
@@ -26,3 +27,27 @@ def get_db():
     finally:
         db.close()
 
+
+
+def _async_database_url(url: str) -> str:
+    """Map the sync DATABASE_URL onto its async driver (aiosqlite/asyncpg)."""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+# Async engine for read-heavy routes; shares the database with the sync engine
+async_engine = create_async_engine(
+    _async_database_url(settings.DATABASE_URL),
+    pool_pre_ping=True,
+)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
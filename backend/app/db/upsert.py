@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from sqlalchemy.orm import Session
+
+
+def dialect_insert(db: Session, table):
+    """Return an INSERT supporting ``on_conflict_do_*`` for the session's dialect."""
+    name = db.get_bind().dialect.name
+    if name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:  # pragma: no cover - only sqlite and Postgres are deployed
+        raise NotImplementedError(f"upsert not supported for dialect {name!r}")
+    return insert(table)
@@ -1,17 +1,42 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 
 from .core.config import settings
-from .db.session import Base, engine, SessionLocal
+from .db.session import Base, engine, SessionLocal, async_engine
 from .api.routes.health import router as health_router
 from .api.routes.auth import router as auth_router
 from .api.routes.weather import router as weather_router
 from .api.routes.recommendations import router as rec_router
 from .api.routes.predictions import router as pred_router
+from .services.ingest_buffer import get_ingest_buffer
+from .services.preference_buffer import get_preference_buffer
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Aman Skies AI Backend", version="0.1.0")
+    app = FastAPI(
+        title="Aman Skies AI Backend",
+        version="0.1.0",
+        default_response_class=ORJSONResponse,
+    )
+
+    # Compress larger responses; prefer brotli if available
+    try:
+        from brotli_asgi import BrotliMiddleware
+
+        app.add_middleware(
+            BrotliMiddleware,
+            quality=4,
+            minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+            gzip_fallback=True,
+        )
+    except ImportError:
+        app.add_middleware(
+            GZipMiddleware,
+            minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+            compresslevel=settings.COMPRESSION_LEVEL,
+        )
 
     # CORS (allow dev frontend; tighten in prod)
     app.add_middleware(
@@ -32,9 +57,18 @@ def create_app() -> FastAPI:
                 Base.metadata.create_all(bind=engine)
                 # Seed activities once
                 from .seed.activities import ensure_seed_activities
+                from .services.weather_ingest import ensure_latest_populated, ensure_weather_indexes
+                from .services.recommender import ensure_unique_preferences
+                from .services.prediction_store import ensure_prediction_runs
+                from .services.live_history import ensure_unique_history
                 db = SessionLocal()
                 try:
                     ensure_seed_activities(db)
+                    ensure_weather_indexes(db)
+                    ensure_latest_populated(db)
+                    ensure_unique_preferences(db)
+                    ensure_prediction_runs(db)
+                    ensure_unique_history(db)
                 finally:
                     db.close()
                 return
@@ -42,6 +76,39 @@ def create_app() -> FastAPI:
                 logging.warning("DB not ready, retrying... (%s) %s", i + 1, e)
                 time.sleep(2)
 
+    @app.on_event("startup")
+    async def _start_ingest_buffer():
+        await get_ingest_buffer().start()
+
+    @app.on_event("shutdown")
+    async def _drain_ingest_buffer():
+        await get_ingest_buffer().stop()
+
+    @app.on_event("startup")
+    async def _start_preference_buffer():
+        if settings.PREFERENCE_BUFFER_ENABLED:
+            await get_preference_buffer().start()
+
+    @app.on_event("shutdown")
+    async def _drain_preference_buffer():
+        await get_preference_buffer().stop()
+
+    @app.on_event("shutdown")
+    def _stop_password_hasher():
+        from .services.password_hasher import get_password_hasher
+
+        get_password_hasher().shutdown()
+
+    @app.on_event("shutdown")
+    async def _close_weather_client():
+        from .services.weather_collector import close_client
+
+        await close_client()
+
+    @app.on_event("shutdown")
+    async def _dispose_async_engine():
+        await async_engine.dispose()
+
     # Routers
     app.include_router(health_router, prefix="/api")
     app.include_router(auth_router, prefix="/api")
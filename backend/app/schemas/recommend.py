@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from datetime import datetime
 from typing import List, Optional
 
 
@@ -25,8 +26,55 @@ class RecommendationResult(BaseModel):
     reason: str
 
 
+class RecommendationScenario(BaseModel):
+    user_id: Optional[int] = None
+    units: str = "metric"
+    temperature: float
+    humidity: float
+    wind_speed: float
+    condition: str
+
+
+class BatchRecommendationRequest(BaseModel):
+    scenarios: List[RecommendationScenario] = Field(min_length=1, max_length=1000)
+    top_k: int = 5
+
+
+class BatchRecommendationResponse(BaseModel):
+    # One list per scenario, in request order
+    results: List[List[RecommendationResult]]
+
+
+class TimelineWindow(BaseModel):
+    start: datetime
+    end: datetime  # exclusive
+    steps: int
+    mean_score: float
+    peak_score: float
+    peak_ts: datetime
+
+
+class ActivityTimeline(BaseModel):
+    key: str
+    label: str
+    windows: List[TimelineWindow]
+
+
+class TimelineResponse(BaseModel):
+    loc_key: str
+    horizon: str
+    steps: int
+    # Where humidity/wind/condition came from: 'request' or 'historical'
+    conditions_source: str
+    activities: List[ActivityTimeline]
+
+
 class FeedbackRequest(BaseModel):
     user_id: int
     activity_key: str
     rating: int  # 1..5
 
+
+
+class BatchFeedbackRequest(BaseModel):
+    items: List[FeedbackRequest] = Field(min_length=1, max_length=1000)
@@ -26,3 +26,8 @@ class WeatherOut(BaseModel):
     class Config:
         from_attributes = True
 
+
+
+class BulkIngestResult(BaseModel):
+    received: int
+    inserted: int
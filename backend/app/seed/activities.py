@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
 from ..db.models import Activity
+from ..services.activity_catalog import invalidate_activity_catalog
 
 
 def ensure_seed_activities(db: Session):
@@ -67,4 +68,5 @@ def ensure_seed_activities(db: Session):
 
     db.add_all(seed)
     db.commit()
+    invalidate_activity_catalog()
 
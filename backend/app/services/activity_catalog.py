@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Iterable, Optional
+import hashlib
+import time
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..db.models import Activity
+from .activity_scoring import CatalogArrays, build_catalog_arrays
+
+
+@dataclass(frozen=True)
+class CompiledActivity:
+    """Read-only view of an ``Activity`` with matching sets lowercased up front."""
+
+    key: str
+    label: str
+    tags: tuple[str, ...]
+    tag_set: frozenset[str]
+    allowed_conditions: frozenset[str]
+    temp_min: Optional[float]
+    temp_max: Optional[float]
+    wind_max: Optional[float]
+    humidity_max: Optional[float]
+
+
+@dataclass(frozen=True)
+class ActivityCatalog:
+    """Immutable snapshot of the activity table.
+
+    ``version`` is a digest of the contents, so it is the same in every
+    process that loaded the same rows and only changes when they change.
+    """
+
+    version: str
+    activities: tuple[CompiledActivity, ...]
+    loaded_at: float = field(compare=False)
+    by_key: dict[str, CompiledActivity] = field(compare=False, repr=False)
+    arrays: CatalogArrays = field(compare=False, repr=False)
+
+
+def _opt_float(v) -> Optional[float]:
+    return None if v is None else float(v)
+
+
+def compile_activity(a: Activity) -> CompiledActivity:
+    tags = tuple(a.tags or ())
+    return CompiledActivity(
+        key=a.key,
+        label=a.label,
+        tags=tags,
+        tag_set=frozenset(t.lower() for t in tags),
+        allowed_conditions=frozenset(c.lower() for c in (a.allowed_conditions or ())),
+        temp_min=_opt_float(a.temp_min),
+        temp_max=_opt_float(a.temp_max),
+        wind_max=_opt_float(a.wind_max),
+        humidity_max=_opt_float(a.humidity_max),
+    )
+
+
+def compile_catalog(rows: Iterable[Activity]) -> ActivityCatalog:
+    # Stable order (by id) keeps rankings of tied scores identical to the old query
+    compiled = tuple(compile_activity(a) for a in sorted(rows, key=lambda a: a.id or 0))
+    digest = hashlib.blake2s(
+        orjson.dumps(
+            [
+                [c.key, c.label, c.tags, sorted(c.allowed_conditions), c.temp_min, c.temp_max, c.wind_max, c.humidity_max]
+                for c in compiled
+            ]
+        ),
+        digest_size=8,
+    ).hexdigest()
+    return ActivityCatalog(
+        version=digest,
+        activities=compiled,
+        loaded_at=time.monotonic(),
+        by_key={c.key: c for c in compiled},
+        arrays=build_catalog_arrays(compiled),
+    )
+
+
+_catalog: Optional[ActivityCatalog] = None
+_lock = Lock()
+
+
+def cached_activity_catalog() -> Optional[ActivityCatalog]:
+    """The process-wide catalog if it is loaded and within its TTL."""
+    catalog = _catalog
+    if catalog is None or time.monotonic() - catalog.loaded_at > settings.ACTIVITY_CATALOG_TTL:
+        return None
+    return catalog
+
+
+def get_activity_catalog(db: Session) -> ActivityCatalog:
+    """Return the compiled catalog, reloading it from ``db`` when missing or expired."""
+    global _catalog
+    catalog = cached_activity_catalog()
+    if catalog is not None:
+        return catalog
+    fresh = compile_catalog(db.execute(select(Activity)).scalars().all())
+    with _lock:
+        if _catalog is not None and _catalog.version == fresh.version:
+            # Unchanged: keep the version but restart the TTL
+            fresh = ActivityCatalog(
+                version=_catalog.version,
+                activities=_catalog.activities,
+                loaded_at=fresh.loaded_at,
+                by_key=_catalog.by_key,
+                arrays=_catalog.arrays,
+            )
+        _catalog = fresh
+    return fresh
+
+
+def invalidate_activity_catalog() -> None:
+    """Drop the cached catalog; call after writing to the activities table."""
+    global _catalog
+    with _lock:
+        _catalog = None
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Sequence
+
+import numpy as np
+
+
+_PRECIP = ("rain", "drizzle", "snow")
+
+
+@dataclass(frozen=True)
+class CatalogArrays:
+    """Column-wise view of a compiled catalog for vectorized scoring.
+
+    Missing thresholds are NaN so every comparison against them is False,
+    which mirrors the ``is not None and ...`` checks of ``score_activity``.
+    ``base`` holds the tag terms, which do not depend on the weather.
+    """
+
+    indoor: np.ndarray  # (A,) bool
+    outdoor: np.ndarray  # (A,) bool
+    has_allowlist: np.ndarray  # (A,) bool
+    allowed_conditions: tuple[frozenset[str], ...]
+    base: np.ndarray  # (A,) float64
+    temp_min: np.ndarray  # (A,) float64
+    temp_max: np.ndarray
+    wind_max: np.ndarray
+    humidity_max: np.ndarray
+    _condition_terms: dict[str, tuple[np.ndarray, np.ndarray]] = field(default_factory=dict, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.base)
+
+    def condition_terms(self, condition_l: str) -> tuple[np.ndarray, np.ndarray]:
+        """The two condition terms of ``score_activity`` for a lowercased condition, memoized."""
+        terms = self._condition_terms.get(condition_l)
+        if terms is not None:
+            return terms
+        allow = self.has_allowlist
+        match = np.array([condition_l in c for c in self.allowed_conditions], dtype=bool)
+        if condition_l == "thunderstorm":
+            other = np.where(allow, 0.0, -0.9)
+            boost = np.zeros(len(self))
+        elif condition_l in _PRECIP:
+            other = np.where(~allow & self.outdoor, -0.5, 0.0)
+            boost = np.where(~allow & self.indoor, 0.4, 0.0)
+        else:
+            other = np.zeros(len(self))
+            boost = np.zeros(len(self))
+        first = np.where(allow, np.where(match, 0.7, -0.5), other)
+        terms = (first, boost)
+        if len(self._condition_terms) < 256:
+            self._condition_terms[condition_l] = terms
+        return terms
+
+
+def build_catalog_arrays(activities) -> CatalogArrays:
+    """Build arrays from ``CompiledActivity`` items (catalog order is kept)."""
+
+    def _col(attr: str) -> np.ndarray:
+        return np.array(
+            [np.nan if getattr(a, attr) is None else getattr(a, attr) for a in activities],
+            dtype=np.float64,
+        )
+
+    indoor = np.array(["indoor" in a.tag_set for a in activities], dtype=bool)
+    outdoor = np.array(["outdoor" in a.tag_set for a in activities], dtype=bool)
+    base = np.zeros(len(activities), dtype=np.float64)
+    base += np.where(indoor, 0.1, 0.0)
+    base += np.where(outdoor, 0.2, 0.0)
+    return CatalogArrays(
+        indoor=indoor,
+        outdoor=outdoor,
+        has_allowlist=np.array([bool(a.allowed_conditions) for a in activities], dtype=bool),
+        allowed_conditions=tuple(a.allowed_conditions for a in activities),
+        base=base,
+        temp_min=_col("temp_min"),
+        temp_max=_col("temp_max"),
+        wind_max=_col("wind_max"),
+        humidity_max=_col("humidity_max"),
+    )
+
+
+def score_weather(
+    arrays: CatalogArrays,
+    *,
+    temp_c,
+    humidity,
+    wind_ms,
+    conditions: Sequence[str],
+) -> np.ndarray:
+    """Weather scores of every activity for S scenarios, shaped (S, A).
+
+    ``temp_c``, ``humidity`` and ``wind_ms`` are scalars or length-S arrays
+    (metric units); ``conditions`` has one entry per scenario. Terms are
+    added in the same order as ``score_activity`` (a skipped branch adds
+    0.0), so the floats are bit-for-bit identical.
+    """
+    temp = np.asarray(temp_c, dtype=np.float64).reshape(-1, 1)
+    hum = np.asarray(humidity, dtype=np.float64).reshape(-1, 1)
+    wind = np.asarray(wind_ms, dtype=np.float64).reshape(-1, 1)
+    if len(conditions) == 1:
+        first, boost = arrays.condition_terms(conditions[0].lower())
+    else:
+        pairs = [arrays.condition_terms(c.lower()) for c in conditions]
+        first = np.stack([p[0] for p in pairs])
+        boost = np.stack([p[1] for p in pairs])
+
+    too_cold = temp < arrays.temp_min
+    too_hot = temp > arrays.temp_max
+
+    n_scenarios = max(len(temp), len(hum), len(wind), len(conditions))
+    score = np.broadcast_to((arrays.base + first) + boost, (n_scenarios, len(arrays))).copy()
+    score += np.where(too_cold, -0.7, 0.0)
+    score += np.where(too_hot, -0.7, 0.0)
+    score += np.where(too_cold | too_hot, 0.0, 0.3)
+    score += np.where(wind > arrays.wind_max, -0.4, 0.15)
+    score += np.where(hum > arrays.humidity_max, -0.25, np.where(hum <= 70, 0.1, 0.0))
+    return score
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` highest scores, highest first, ties by position.
+
+    Same order as a stable ``sort(reverse=True)``; ``argpartition`` narrows
+    the candidates and every value tied with the k-th is kept before the
+    final sort so the tie-break cannot depend on the partition.
+    """
+    n = scores.shape[0]
+    k = max(0, min(int(k), n))
+    if k == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        kth = scores[np.argpartition(scores, n - k)[n - k]]
+        candidates = np.flatnonzero(scores >= kth)
+    else:
+        candidates = np.arange(n)
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order[:k]]
+
+
+def contiguous_windows(scores: np.ndarray, min_score: float, min_steps: int = 1):
+    """Runs of consecutive steps with ``scores >= min_score`` for each row of an (A, T) matrix.
+
+    Returns ``(rows, starts, ends, means)`` arrays, one entry per run; ``ends``
+    is exclusive. Run boundaries come from one ``diff`` over the padded
+    mask and run means from row-wise cumulative sums.
+    """
+    good = scores >= min_score
+    padded = np.zeros((good.shape[0], good.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = good
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)  # same row-major order as the starts
+    lengths = ends - starts
+    keep = lengths >= max(1, int(min_steps))
+    rows, starts, ends, lengths = rows[keep], starts[keep], ends[keep], lengths[keep]
+    csum = np.zeros((scores.shape[0], scores.shape[1] + 1), dtype=np.float64)
+    np.cumsum(scores, axis=1, out=csum[:, 1:])
+    means = (csum[rows, ends] - csum[rows, starts]) / lengths
+    return rows, starts, ends, means
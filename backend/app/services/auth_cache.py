@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+import time
+
+from ..core.config import settings
+from .cache import TTLCache
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Detached copy of the ``User`` fields request handlers need."""
+
+    id: int
+    email: str
+    preferences: Optional[dict] = None
+
+
+class AuthCache:
+    """Verified tokens and user lookups for ``get_current_user``.
+
+    ``tokens`` maps a token that already passed signature and expiry checks
+    to ``(email, exp)``; an entry never outlives the token's own ``exp``.
+    ``users`` maps an email to a ``UserSnapshot`` and is what
+    ``invalidate_user`` drops when the account changes.
+    """
+
+    def __init__(self, *, maxsize: int = 10000, token_ttl: float = 300.0, user_ttl: float = 60.0):
+        self.tokens = TTLCache(maxsize=maxsize, ttl=token_ttl)
+        self.users = TTLCache(maxsize=maxsize, ttl=user_ttl)
+
+    def get_token(self, token: str) -> Optional[str]:
+        entry = self.tokens.get(token)
+        if entry is None:
+            return None
+        email, exp = entry
+        if exp is not None and exp <= time.time():
+            self.tokens.pop(token)
+            return None
+        return email
+
+    def set_token(self, token: str, email: str, exp: Optional[float]) -> None:
+        ttl = self.tokens.ttl
+        if exp is not None:
+            ttl = min(ttl, exp - time.time())
+        if ttl > 0:
+            self.tokens.set(token, (email, exp), ttl=ttl)
+
+    def invalidate_user(self, email: str) -> None:
+        self.users.pop(email)
+
+    def clear(self) -> None:
+        self.tokens.clear()
+        self.users.clear()
+
+
+_auth_cache: Optional[AuthCache] = None
+
+
+def get_auth_cache() -> AuthCache:
+    global _auth_cache
+    if _auth_cache is None:
+        _auth_cache = AuthCache(
+            maxsize=settings.AUTH_CACHE_MAX_ENTRIES,
+            token_ttl=settings.AUTH_TOKEN_CACHE_TTL,
+            user_ttl=settings.AUTH_USER_CACHE_TTL,
+        )
+    return _auth_cache
+
+
+def invalidate_user(email: str) -> None:
+    """Forget the cached snapshot for ``email``; call after changing that user."""
+    get_auth_cache().invalidate_user(email)
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from typing import Any, Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+
+import orjson
+
+from ..core.config import settings
+from .cache import TTLCache
+from .weather_collector import fetch_current_weather
+
+
+log = logging.getLogger(__name__)
+
+Fetcher = Callable[[float, float, str], Awaitable[Dict[str, Any]]]
+
+
+class CurrentWeatherCache:
+    """TTL cache with request coalescing in front of ``fetch_current_weather``.
+
+    Coordinates are rounded to ``precision`` decimals and the upstream call
+    is made for the rounded point, so every caller in the same cell shares
+    one entry. Concurrent misses for a key await the same in-flight fetch.
+    The optional Redis tier is shared between processes; any client exposing
+    ``get``/``set`` (e.g. ``fakeredis.FakeRedis``) can be passed in.
+    In-flight fetches are tied to the event loop that started them.
+    """
+
+    def __init__(
+        self,
+        *,
+        fetch: Fetcher = fetch_current_weather,
+        ttl: float = 600.0,
+        precision: int = 2,
+        max_entries: int = 4096,
+        redis_client: Any = None,
+    ):
+        self._fetch = fetch
+        self.ttl = float(ttl)
+        self.precision = int(precision)
+        self._local = TTLCache(maxsize=max_entries, ttl=ttl)
+        self._inflight: dict[tuple, asyncio.Task] = {}
+        self.redis = redis_client
+        self.upstream_calls = 0
+
+    def key(self, lat: float, lon: float, units: str) -> tuple[float, float, str]:
+        return (round(float(lat), self.precision), round(float(lon), self.precision), units)
+
+    @staticmethod
+    def _redis_key(key: tuple[float, float, str]) -> str:
+        lat, lon, units = key
+        return f"owm:current:{units}:{lat}:{lon}"
+
+    async def get(self, lat: float, lon: float, units: str = "metric") -> Dict[str, Any]:
+        key = self.key(lat, lon, units)
+        value = self._local.get(key)
+        if value is not None:
+            return value
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t, k=key: self._inflight.pop(k, None))
+        # shield: one caller being cancelled must not cancel the shared fetch
+        return await asyncio.shield(task)
+
+    async def _load(self, key: tuple[float, float, str]) -> Dict[str, Any]:
+        if self.redis is not None:
+            value = await asyncio.to_thread(self._redis_get, key)
+            if value is not None:
+                self._local.set(key, value)
+                return value
+        self.upstream_calls += 1
+        value = await self._fetch(*key)
+        self._local.set(key, value)
+        if self.redis is not None:
+            await asyncio.to_thread(self._redis_set, key, value)
+        return value
+
+    def _redis_get(self, key: tuple[float, float, str]) -> Optional[Dict[str, Any]]:
+        try:
+            raw = self.redis.get(self._redis_key(key))
+        except Exception as e:
+            log.debug("current weather cache redis get failed: %s", e)
+            return None
+        return None if raw is None else orjson.loads(raw)
+
+    def _redis_set(self, key: tuple[float, float, str], value: Dict[str, Any]) -> None:
+        try:
+            self.redis.set(self._redis_key(key), orjson.dumps(value), ex=max(1, int(self.ttl)))
+        except Exception as e:
+            log.debug("current weather cache redis set failed: %s", e)
+
+    def clear(self) -> None:
+        self._local.clear()
+
+
+_current_weather_cache: Optional[CurrentWeatherCache] = None
+
+
+def get_current_weather_cache() -> CurrentWeatherCache:
+    global _current_weather_cache
+    if _current_weather_cache is None:
+        redis_client = None
+        if settings.OPENWEATHER_CACHE_REDIS:
+            import redis
+
+            redis_client = redis.Redis.from_url(settings.REDIS_URL)
+        _current_weather_cache = CurrentWeatherCache(
+            ttl=settings.OPENWEATHER_CACHE_TTL,
+            precision=settings.OPENWEATHER_CACHE_PRECISION,
+            max_entries=settings.OPENWEATHER_CACHE_MAX_ENTRIES,
+            redis_client=redis_client,
+        )
+    return _current_weather_cache
+
+
+def set_current_weather_cache(cache: Optional[CurrentWeatherCache]) -> None:
+    """Replace the process-wide cache (e.g. with a fakeredis-backed one in tests)."""
+    global _current_weather_cache
+    _current_weather_cache = cache
+
+
+async def get_current_weather(lat: float, lon: float, units: str = "metric") -> Dict[str, Any]:
+    return await get_current_weather_cache().get(lat, lon, units)
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: pick ``n_out`` indices preserving the visual shape.
+
+    ``x`` must be sorted ascending. First and last points are always kept.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket boundaries for the n - 2 interior points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0] = 0
+    out[-1] = n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point for the final bucket)
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nlo:nhi].mean()
+        avg_y = y[nlo:nhi].mean()
+        area = np.abs(
+            (x[prev] - avg_x) * (y[lo:hi] - y[prev])
+            - (x[prev] - x[lo:hi]) * (avg_y - y[prev])
+        )
+        prev = lo + int(np.argmax(area))
+        out[i + 1] = prev
+    return out
+
+
+def minmax_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Keep the min and max of each of ``n_out // 2`` equal-width buckets."""
+    n = len(x)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    n_buckets = max(1, n_out // 2)
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    starts = edges[:-1]
+    # reduceat over contiguous buckets gives per-bucket extremes without a Python loop
+    mins = np.minimum.reduceat(y, starts)
+    maxs = np.maximum.reduceat(y, starts)
+    idx = []
+    for start, end, lo_v, hi_v in zip(starts, edges[1:], mins, maxs):
+        seg = y[start:end]
+        a = start + int(np.argmax(seg == lo_v))
+        b = start + int(np.argmax(seg == hi_v))
+        idx.extend((a, b) if a <= b else (b, a))
+    return np.unique(np.asarray(idx, dtype=np.int64))
+
+
+def downsample(x: np.ndarray, y: np.ndarray, n_out: int, method: str = "lttb") -> np.ndarray:
+    if method == "minmax":
+        return minmax_indices(x, y, n_out)
+    return lttb_indices(x, y, n_out)
@@ -6,7 +6,8 @@ import pandas as pd
 from sqlalchemy.orm import Session
 
 from .historical import loc_key_from_latlon
-from ..db.models import Prediction, ModelRegistry, HistoricalWeather
+from .prediction_store import forecast_rows, write_prediction_set
+from ..db.models import ModelRegistry, HistoricalWeather
 from .trainer_daily import _fit_ets_forecast as fit_ets_daily
 from .trainer_hourly import _fit_ets_hourly as fit_ets_hourly
 
@@ -147,24 +148,15 @@ def build_daily_ensemble(db: Session, *, lat: float, lon: float, days: int = 7)
         final = _blend(prophet_df, ets_df, wa=1.0, wb=wb)
         versions = {"daily": "prophet_v1+ets_v1"}
 
-    # Replace predictions with ensemble
-    db.query(Prediction).filter(
-        Prediction.loc_key == key, Prediction.horizon == "daily"
-    ).delete()
-    inserted = 0
-    for _, row in final.iterrows():
-        p = Prediction(
-            loc_key=key,
-            horizon="daily",
-            ts=pd.to_datetime(row["ds"]).to_pydatetime().replace(tzinfo=None),
-            yhat=float(row["yhat"]),
-            yhat_lower=float(row["yhat_lower"]),
-            yhat_upper=float(row["yhat_upper"]),
-            ensemble=1,
-            model_versions=versions,
-        )
-        db.add(p)
-        inserted += 1
+    # Write a new prediction set and flip the current-run pointer
+    inserted = write_prediction_set(
+        db,
+        key=key,
+        horizon="daily",
+        rows=forecast_rows(final),
+        ensemble=1,
+        model_versions=versions,
+    )
 
     reg = ModelRegistry(
         loc_key=key,
@@ -197,23 +189,15 @@ def build_hourly_ensemble(db: Session, *, lat: float, lon: float, hours: int = 4
         final = _blend(lstm_df, ets_df, wa=1.0, wb=wb)
         versions = {"hourly": "lstm_v1+ets_v1"}
 
-    db.query(Prediction).filter(
-        Prediction.loc_key == key, Prediction.horizon == "hourly"
-    ).delete()
-    inserted = 0
-    for _, row in final.iterrows():
-        p = Prediction(
-            loc_key=key,
-            horizon="hourly",
-            ts=pd.to_datetime(row["ds"]).to_pydatetime().replace(tzinfo=None),
-            yhat=float(row["yhat"]),
-            yhat_lower=float(row["yhat_lower"]),
-            yhat_upper=float(row["yhat_upper"]),
-            ensemble=1,
-            model_versions=versions,
-        )
-        db.add(p)
-        inserted += 1
+    # Write a new prediction set and flip the current-run pointer
+    inserted = write_prediction_set(
+        db,
+        key=key,
+        horizon="hourly",
+        rows=forecast_rows(final),
+        ensemble=1,
+        model_versions=versions,
+    )
 
     reg = ModelRegistry(
         loc_key=key,
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from threading import Lock
+from typing import Any, Optional
+import asyncio
+import logging
+
+import orjson
+
+from ..core.config import settings
+from .cache import TTLCache
+
+
+log = logging.getLogger(__name__)
+
+
+class ForecastCache:
+    """Read-through cache for forecast windows and their ETags.
+
+    Entries are keyed by ``(loc_key, horizon, generation, window)``; a write
+    of a new prediction set bumps the generation so a reader that loaded
+    the old set before the write can never publish it under the new one.
+
+    Without Redis the generation lives in this process only. Sets committed
+    by another process (the Celery worker) are then picked up only once
+    ``local_ttl`` expires. With a Redis client (anything exposing
+    ``get``/``incr``/``hget``/``hset``/``expire``/``delete``, e.g.
+    ``fakeredis.FakeRedis``) the generation is a shared ``INCR`` counter
+    and every Redis hash is versioned by it, so invalidation reaches all
+    processes and a late writer only fills a hash nobody reads any more.
+    That costs one Redis ``GET`` per lookup. A lookup that cannot read the
+    generation returns ``(None, None)`` and the result is not cached.
+    """
+
+    def __init__(
+        self,
+        *,
+        local_ttl: float = 30.0,
+        max_entries: int = 2048,
+        redis_client: Any = None,
+        redis_ttl: int = 3600,
+    ):
+        self._local = TTLCache(maxsize=max_entries, ttl=local_ttl)
+        self._generations: dict[tuple[str, str], int] = {}
+        self._lock = Lock()
+        self.redis = redis_client
+        self.redis_ttl = int(redis_ttl)
+
+    @staticmethod
+    def _redis_key(loc_key: str, horizon: str, gen: int) -> str:
+        return f"forecast:{loc_key}:{horizon}:{gen}"
+
+    @staticmethod
+    def _generation_key(loc_key: str, horizon: str) -> str:
+        return f"forecast-gen:{loc_key}:{horizon}"
+
+    def generation(self, loc_key: str, horizon: str) -> Optional[int]:
+        if self.redis is None:
+            return self._generations.get((loc_key, horizon), 0)
+        try:
+            return int(self.redis.get(self._generation_key(loc_key, horizon)) or 0)
+        except Exception as e:
+            log.debug("forecast cache redis generation failed: %s", e)
+            return None
+
+    def lookup(self, loc_key: str, horizon: str, window: int) -> tuple[Optional[int], Any]:
+        """Return ``(generation, value)``; pass the generation to ``set`` after a miss."""
+        gen = self.generation(loc_key, horizon)
+        if gen is None:
+            return None, None
+        value = self._local.get((loc_key, horizon, gen, window))
+        if value is not None or self.redis is None:
+            return gen, value
+        return gen, self._redis_get(loc_key, horizon, gen, window)
+
+    async def alookup(self, loc_key: str, horizon: str, window: int) -> tuple[Optional[int], Any]:
+        """Like ``lookup`` but keeps blocking Redis calls off the event loop."""
+        if self.redis is None:
+            return self.lookup(loc_key, horizon, window)
+        return await asyncio.to_thread(self.lookup, loc_key, horizon, window)
+
+    def _redis_get(self, loc_key: str, horizon: str, gen: int, window: int) -> Any:
+        try:
+            raw = self.redis.hget(self._redis_key(loc_key, horizon, gen), str(window))
+        except Exception as e:
+            log.debug("forecast cache redis get failed: %s", e)
+            return None
+        if raw is None:
+            return None
+        value = orjson.loads(raw)
+        self._local.set((loc_key, horizon, gen, window), value)
+        return value
+
+    def set(self, loc_key: str, horizon: str, window: int, value: Any, *, generation: Optional[int]) -> None:
+        """Store a window computed after ``lookup`` returned ``generation``."""
+        if self._set_local(loc_key, horizon, window, value, generation) and self.redis is not None:
+            self._redis_set(loc_key, horizon, generation, window, value)
+
+    async def aset(self, loc_key: str, horizon: str, window: int, value: Any, *, generation: Optional[int]) -> None:
+        if self._set_local(loc_key, horizon, window, value, generation) and self.redis is not None:
+            await asyncio.to_thread(self._redis_set, loc_key, horizon, generation, window, value)
+
+    def _set_local(self, loc_key: str, horizon: str, window: int, value: Any, generation: Optional[int]) -> bool:
+        if generation is None:
+            return False
+        if self.redis is None and generation != self.generation(loc_key, horizon):
+            # Invalidated while the caller was reading; drop the stale value.
+            return False
+        self._local.set((loc_key, horizon, generation, window), value)
+        return True
+
+    def _redis_set(self, loc_key: str, horizon: str, gen: int, window: int, value: Any) -> None:
+        try:
+            rkey = self._redis_key(loc_key, horizon, gen)
+            self.redis.hset(rkey, str(window), orjson.dumps(value))
+            self.redis.expire(rkey, self.redis_ttl)
+        except Exception as e:
+            log.debug("forecast cache redis set failed: %s", e)
+
+    def invalidate(self, loc_key: str, horizon: str) -> None:
+        with self._lock:
+            self._generations[(loc_key, horizon)] = self._generations.get((loc_key, horizon), 0) + 1
+        if self.redis is None:
+            return
+        try:
+            gen = int(self.redis.incr(self._generation_key(loc_key, horizon)))
+            self.redis.delete(self._redis_key(loc_key, horizon, gen - 1))
+        except Exception as e:
+            log.warning("forecast cache redis invalidate failed: %s", e)
+
+    def clear(self) -> None:
+        self._local.clear()
+        with self._lock:
+            self._generations.clear()
+
+
+_forecast_cache: Optional[ForecastCache] = None
+
+
+def get_forecast_cache() -> ForecastCache:
+    global _forecast_cache
+    if _forecast_cache is None:
+        redis_client = None
+        if settings.FORECAST_CACHE_REDIS:
+            import redis
+
+            redis_client = redis.Redis.from_url(settings.REDIS_URL)
+        _forecast_cache = ForecastCache(
+            local_ttl=settings.FORECAST_CACHE_LOCAL_TTL,
+            max_entries=settings.FORECAST_CACHE_MAX_ENTRIES,
+            redis_client=redis_client,
+            redis_ttl=settings.FORECAST_CACHE_REDIS_TTL,
+        )
+    return _forecast_cache
+
+
+def set_forecast_cache(cache: Optional[ForecastCache]) -> None:
+    """Replace the process-wide cache (e.g. with a fakeredis-backed one in tests)."""
+    global _forecast_cache
+    _forecast_cache = cache
@@ -9,10 +9,8 @@ import httpx
 
 from sqlalchemy.orm import Session
 from ..db.models import HistoricalWeather
-
-
-def loc_key_from_latlon(lat: float, lon: float, precision: int = 3) -> str:
-    return f"{round(lat, precision)},{round(lon, precision)}"
+from ..db.upsert import dialect_insert
+from .locations import loc_key_from_latlon
 
 
 def _condition_from_code(code: Optional[int]) -> str:
@@ -136,34 +134,24 @@ def backfill_historical(db: Session, *, lat: float, lon: float, months: int = 12
     if "ts" not in df.columns:
         raise ValueError(f"ts column missing in normalized dataframe; columns={list(df.columns)}")
 
-    inserted = 0
-    # Upsert row-by-row to avoid dependency on dialect-specific ON CONFLICT for now
-    for _, row in df.iterrows():
-        ts_val = row["ts"]
-        ts = pd.to_datetime(ts_val, utc=True).to_pydatetime().replace(tzinfo=None)
-        exists = (
-            db.query(HistoricalWeather)
-            .filter(HistoricalWeather.loc_key == key, HistoricalWeather.ts == ts)
-            .first()
-        )
-        if exists:
-            continue
-        rec = HistoricalWeather(
-            loc_key=key,
-            ts=ts,
-            temp_c=None if pd.isna(row["temp_c"]) else float(row["temp_c"]),
-            humidity=None if pd.isna(row["humidity"]) else float(row["humidity"]),
-            pressure=None if pd.isna(row["pressure"]) else float(row["pressure"]),
-            wind_speed=None if pd.isna(row["wind_speed"]) else float(row["wind_speed"]),
-            condition=row["condition"] if isinstance(row["condition"], str) else "Unknown",
-            source="meteostat",
-        )
-        db.add(rec)
-        inserted += 1
-
-        # Flush every 1000 rows to keep memory reasonable
-        if inserted % 1000 == 0:
-            db.commit()
+    rows = [
+        {
+            "loc_key": key,
+            "ts": pd.to_datetime(row["ts"], utc=True).to_pydatetime().replace(tzinfo=None),
+            "temp_c": None if pd.isna(row["temp_c"]) else float(row["temp_c"]),
+            "humidity": None if pd.isna(row["humidity"]) else float(row["humidity"]),
+            "pressure": None if pd.isna(row["pressure"]) else float(row["pressure"]),
+            "wind_speed": None if pd.isna(row["wind_speed"]) else float(row["wind_speed"]),
+            "condition": row["condition"] if isinstance(row["condition"], str) else "Unknown",
+            "source": "meteostat",
+        }
+        for _, row in df.iterrows()
+    ]
 
-    db.commit()
+    inserted = 0
+    # Existing (loc_key, ts) pairs are skipped via uq_hist_loc_ts; commit per chunk
+    for i in range(0, len(rows), 500):
+        stmt = dialect_insert(db, HistoricalWeather).values(rows[i : i + 500])
+        inserted += int(db.execute(stmt.on_conflict_do_nothing(index_elements=["loc_key", "ts"])).rowcount or 0)
+        db.commit()
     return inserted
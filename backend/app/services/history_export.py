@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Iterator, Optional
+import io
+
+import orjson
+
+from sqlalchemy import select
+
+from ..db.models import HistoricalWeather
+from ..db.session import SessionLocal
+
+
+EXPORT_COLUMNS = ("ts", "temp_c", "humidity", "pressure", "wind_speed", "condition", "source")
+
+
+def iter_history_chunks(
+    key: str,
+    *,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    chunk_size: int = 2000,
+) -> Iterator[list[Any]]:
+    """Yield historical rows for ``key`` in ts order, ``chunk_size`` rows at a time.
+
+    Uses a server-side cursor so memory stays bounded by one chunk. The
+    session is owned by the generator because the response body outlives
+    the request's dependencies.
+    """
+    stmt = select(*(getattr(HistoricalWeather, c) for c in EXPORT_COLUMNS)).where(
+        HistoricalWeather.loc_key == key
+    )
+    if start is not None:
+        stmt = stmt.where(HistoricalWeather.ts >= start)
+    if end is not None:
+        stmt = stmt.where(HistoricalWeather.ts <= end)
+    stmt = stmt.order_by(HistoricalWeather.ts.asc()).execution_options(
+        stream_results=True, yield_per=chunk_size
+    )
+
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt)
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+
+def ndjson_stream(chunks: Iterator[list[Any]]) -> Iterator[bytes]:
+    for rows in chunks:
+        yield b"".join(
+            orjson.dumps(
+                {
+                    "ts": r.ts,
+                    "temp_c": r.temp_c,
+                    "humidity": r.humidity,
+                    "pressure": r.pressure,
+                    "wind_speed": r.wind_speed,
+                    "condition": r.condition,
+                    "source": r.source,
+                },
+                option=orjson.OPT_APPEND_NEWLINE,
+            )
+            for r in rows
+        )
+
+
+def arrow_stream(chunks: Iterator[list[Any]]) -> Iterator[bytes]:
+    """Encode chunks as an Arrow IPC stream, one record batch per chunk."""
+    import pyarrow as pa
+
+    schema = pa.schema(
+        [
+            ("ts", pa.timestamp("s")),
+            ("temp_c", pa.float64()),
+            ("humidity", pa.float64()),
+            ("pressure", pa.float64()),
+            ("wind_speed", pa.float64()),
+            ("condition", pa.string()),
+            ("source", pa.string()),
+        ]
+    )
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+
+    def _drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    try:
+        for rows in chunks:
+            columns = list(zip(*rows))
+            arrays = [pa.array(col, type=field.type) for col, field in zip(columns, schema)]
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+            yield _drain()
+    finally:
+        writer.close()
+    yield _drain()
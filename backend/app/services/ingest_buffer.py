@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Callable, Optional, Sequence
+import asyncio
+import logging
+import time
+
+from ..core.config import settings
+from ..core.metrics import LatencyStats
+from ..db.session import SessionLocal
+from ..schemas.weather import WeatherIngest
+from .weather_ingest import bulk_insert_observations
+
+
+log = logging.getLogger(__name__)
+
+
+class BufferFull(Exception):
+    """Raised when the buffer cannot accept more records in time."""
+
+
+def _write_observations(records: list[WeatherIngest]) -> int:
+    db = SessionLocal()
+    try:
+        return bulk_insert_observations(db, records)
+    finally:
+        db.close()
+
+
+class IngestBuffer:
+    """Write-behind buffer that batches observations into few transactions.
+
+    Records are flushed when ``max_batch`` are pending or the oldest one has
+    waited ``flush_interval`` seconds. Once ``max_pending`` records are
+    queued or being written, producers wait up to their timeout for space
+    and then get ``BufferFull``. A failed flush puts its batch back at the
+    head of the queue and retries after an exponential backoff; a record is
+    dropped (and logged) only after ``max_attempts`` failed flushes.
+    ``stop`` flushes everything still queued.
+    """
+
+    def __init__(
+        self,
+        *,
+        flush: Callable[[list[WeatherIngest]], int] = _write_observations,
+        max_batch: int = 500,
+        flush_interval: float = 1.0,
+        max_pending: int = 20000,
+        max_attempts: int = 8,
+        retry_backoff: float = 0.5,
+    ):
+        self._flush = flush
+        self.max_batch = max(1, int(max_batch))
+        self.flush_interval = float(flush_interval)
+        self.max_pending = max(self.max_batch, int(max_pending))
+        self.max_attempts = max(1, int(max_attempts))
+        self.retry_backoff = float(retry_backoff)
+        # (enqueued_at, failed attempts, record)
+        self._items: deque[tuple[float, int, WeatherIngest]] = deque()
+        self._inflight = 0
+        self._has_items: Optional[asyncio.Event] = None
+        self._space: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.enqueued = 0
+        self.flushed = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.flush_latency = LatencyStats()
+        self.queue_lag = LatencyStats()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def pending(self) -> int:
+        return len(self._items) + self._inflight
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._closing = False
+        self._has_items = asyncio.Event()
+        self._space = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="ingest-buffer")
+
+    async def stop(self) -> None:
+        """Stop accepting records and drain what is queued."""
+        if self._task is None:
+            return
+        self._closing = True
+        self._has_items.set()
+        await self._task
+        self._task = None
+
+    async def put_many(self, records: Sequence[WeatherIngest], *, timeout: float = 0.0) -> None:
+        n = len(records)
+        if self._closing or not self.running:
+            raise BufferFull("ingest buffer is not running")
+        if n > self.max_pending:
+            self.rejected += n
+            raise BufferFull("batch larger than buffer capacity")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.max_pending - self.pending < n:
+            remaining = deadline - loop.time()
+            if remaining <= 0 or self._closing:
+                self.rejected += n
+                raise BufferFull("ingest buffer is full")
+            self._space.clear()
+            try:
+                await asyncio.wait_for(self._space.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+        now = time.monotonic()
+        self._items.extend((now, 0, r) for r in records)
+        self.enqueued += n
+        self._has_items.set()
+
+    async def _run(self) -> None:
+        while True:
+            if not self._items:
+                if self._closing:
+                    return
+                self._has_items.clear()
+                await self._has_items.wait()
+                continue
+            # Wait for a full batch, the oldest record falling due, or shutdown
+            due = self._items[0][0] + self.flush_interval
+            while len(self._items) < self.max_batch and not self._closing:
+                remaining = due - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._has_items.clear()
+                try:
+                    await asyncio.wait_for(self._has_items.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            batch = [self._items.popleft() for _ in range(min(self.max_batch, len(self._items)))]
+            # In-flight records still count against max_pending so a retry
+            # can always be put back without exceeding it
+            self._inflight = len(batch)
+            try:
+                backoff = await self._flush_batch(batch)
+            finally:
+                self._inflight = 0
+                self._space.set()
+            if backoff:
+                await asyncio.sleep(backoff)
+
+    async def _flush_batch(self, batch: list[tuple[float, int, WeatherIngest]]) -> float:
+        """Write one batch; on failure requeue it and return the delay before the next try."""
+        started = time.monotonic()
+        self.queue_lag.observe(started - batch[0][0])
+        try:
+            written = await asyncio.to_thread(self._flush, [r for _, _, r in batch])
+            self.flushed += written
+            return 0.0
+        except Exception:
+            self.failed += len(batch)
+            log.exception("ingest buffer flush of %s records failed", len(batch))
+        finally:
+            self.flush_latency.observe(time.monotonic() - started)
+
+        retry = [(ts, attempts + 1, r) for ts, attempts, r in batch if attempts + 1 < self.max_attempts]
+        dropped = len(batch) - len(retry)
+        if dropped:
+            self.dropped += dropped
+            log.error(
+                "ingest buffer dropped %s records after %s failed flush attempts", dropped, self.max_attempts
+            )
+        if not retry:
+            return 0.0
+        self._items.extendleft(reversed(retry))
+        self.retried += len(retry)
+        attempts = max(a for _, a, _ in retry)
+        return min(self.retry_backoff * 2 ** (attempts - 1), 30.0)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "flush_latency": self.flush_latency.snapshot(),
+            "queue_lag": self.queue_lag.snapshot(),
+        }
+
+
+_ingest_buffer: Optional[IngestBuffer] = None
+
+
+def get_ingest_buffer() -> IngestBuffer:
+    global _ingest_buffer
+    if _ingest_buffer is None:
+        _ingest_buffer = IngestBuffer(
+            max_batch=settings.INGEST_BUFFER_MAX_BATCH,
+            flush_interval=settings.INGEST_BUFFER_FLUSH_INTERVAL,
+            max_pending=settings.INGEST_BUFFER_MAX_PENDING,
+            max_attempts=settings.INGEST_BUFFER_MAX_ATTEMPTS,
+            retry_backoff=settings.INGEST_BUFFER_RETRY_BACKOFF,
+        )
+    return _ingest_buffer
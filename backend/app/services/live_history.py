@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import delete, func, inspect, select, union
+from sqlalchemy.orm import Session
+import logging
+
+from ..db.models import HistoricalWeather, ModelRegistry, PredictionRun
+from ..db.upsert import dialect_insert
+
+
+log = logging.getLogger(__name__)
+
+
+def tracked_loc_keys(db: Session, *, limit: int = 500) -> list[str]:
+    """Locations worth polling: anything with a trained model or a forecast."""
+    keys = union(select(ModelRegistry.loc_key), select(PredictionRun.loc_key)).subquery()
+    rows = db.execute(select(keys.c.loc_key).where(keys.c.loc_key.is_not(None)).limit(limit))
+    return sorted(k for (k,) in rows if k)
+
+
+def latlon_from_loc_key(key: str) -> tuple[float, float]:
+    lat, lon = key.split(",")
+    return float(lat), float(lon)
+
+
+def history_row_from_payload(key: str, payload: dict[str, Any]) -> Optional[dict[str, Any]]:
+    """Normalize a metric OpenWeather current-weather payload to a ``historical_weather`` row.
+
+    The observation time is floored to the hour (UTC, naive) to line up
+    with the hourly archive rows.
+    """
+    dt = payload.get("dt")
+    if dt is None:
+        return None
+    ts = datetime.fromtimestamp(int(dt), tz=timezone.utc).replace(minute=0, second=0, microsecond=0, tzinfo=None)
+    main = payload.get("main") or {}
+    wind = payload.get("wind") or {}
+    conditions = payload.get("weather") or [{}]
+    return {
+        "loc_key": key,
+        "ts": ts,
+        "temp_c": main.get("temp"),
+        "humidity": main.get("humidity"),
+        "pressure": main.get("pressure"),
+        "wind_speed": wind.get("speed"),  # m/s in metric units
+        "condition": conditions[0].get("main") or "Unknown",
+        "source": "openweather",
+    }
+
+
+def append_history(db: Session, rows: Iterable[dict[str, Any]]) -> int:
+    """Insert rows whose (loc_key, ts) is not stored yet and commit.
+
+    Conflicts on ``uq_hist_loc_ts`` are skipped by the database, so runs
+    overlapping a backfill or another collection cannot add duplicates;
+    within the batch the first row for a pair wins.
+    """
+    fresh: dict[tuple[str, datetime], dict[str, Any]] = {}
+    for row in rows:
+        fresh.setdefault((row["loc_key"], row["ts"]), row)
+    if not fresh:
+        return 0
+    stmt = dialect_insert(db, HistoricalWeather).values(list(fresh.values()))
+    inserted = db.execute(stmt.on_conflict_do_nothing(index_elements=["loc_key", "ts"])).rowcount
+    db.commit()
+    return int(inserted or 0)
+
+
+def ensure_unique_history(db: Session) -> None:
+    """Add the (loc_key, ts) unique index to a pre-existing table.
+
+    Duplicates are collapsed onto the lowest id first. Nothing is scanned
+    when the index already exists, so normal startups stay cheap.
+    """
+    index = next(i for i in HistoricalWeather.__table__.indexes if i.name == "uq_hist_loc_ts")
+    bind = db.get_bind()
+    if any(i["name"] == index.name for i in inspect(bind).get_indexes(HistoricalWeather.__tablename__)):
+        return
+    keep = select(func.min(HistoricalWeather.id)).group_by(HistoricalWeather.loc_key, HistoricalWeather.ts)
+    removed = db.execute(delete(HistoricalWeather).where(HistoricalWeather.id.not_in(keep))).rowcount
+    db.commit()
+    if removed:
+        log.warning("removed %s duplicate historical weather rows", removed)
+    index.create(bind=bind, checkfirst=True)
+
+
+def history_is_fresh(db: Session, key: str, *, max_age: timedelta, min_rows: int = 168) -> bool:
+    """True when ``key`` has enough history and its newest row is within ``max_age``.
+
+    Trainers use this to skip re-pulling the archive when live collection
+    already keeps the series current.
+    """
+    latest, count = db.execute(
+        select(func.max(HistoricalWeather.ts), func.count()).where(HistoricalWeather.loc_key == key)
+    ).one()
+    if latest is None or count < min_rows:
+        return False
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return now - latest <= max_age
@@ -0,0 +1,5 @@
+from __future__ import annotations
+
+
+def loc_key_from_latlon(lat: float, lon: float, precision: int = 3) -> str:
+    return f"{round(lat, precision)},{round(lon, precision)}"
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Callable, Optional, TypeVar
+import asyncio
+import time
+
+from ..core.config import settings
+from ..core.metrics import LatencyStats
+from ..core.security import pwd_context
+
+
+T = TypeVar("T")
+
+
+class HasherBusy(Exception):
+    """Raised when too many password operations are already queued."""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated thread pool.
+
+    bcrypt releases the GIL, so a few threads use real cores without
+    occupying the shared request threadpool. At most ``max_pending``
+    operations may be running or queued; beyond that callers get
+    ``HasherBusy`` right away instead of waiting behind a login burst.
+    """
+
+    def __init__(self, *, workers: int = 2, max_pending: int = 32):
+        self.workers = max(1, int(workers))
+        self.max_pending = max(self.workers, int(max_pending))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._lock = Lock()
+        self.rejected = 0
+        self.rehashed = 0
+        self.queue_wait = LatencyStats()
+        self.hash_time = LatencyStats()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _run(self, fn: Callable[[], T]) -> T:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HasherBusy("password hashing queue is full")
+            self._pending += 1
+        submitted = time.monotonic()
+
+        def _timed() -> T:
+            started = time.monotonic()
+            self.queue_wait.observe(started - submitted)
+            try:
+                return fn()
+            finally:
+                self.hash_time.observe(time.monotonic() - started)
+
+        try:
+            future = self._pool().submit(_timed)
+        except BaseException:
+            self._release(None)
+            raise
+        # Released when the thread work ends, not when the caller stops
+        # waiting: a cancelled request (client gone) leaves bcrypt running.
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(lambda: pwd_context.hash(password))
+
+    async def verify_and_update(self, password: str, hashed: str) -> tuple[bool, Optional[str]]:
+        """Verify ``password``; also return a new hash when ``hashed`` uses outdated settings."""
+        ok, new_hash = await self._run(lambda: pwd_context.verify_and_update(password, hashed))
+        if new_hash is not None:
+            self.rehashed += 1
+        return ok, new_hash
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "rounds": settings.BCRYPT_ROUNDS,
+            "queue_wait": self.queue_wait.snapshot(),
+            "hash_time": self.hash_time.snapshot(),
+        }
+
+
+_hasher: Optional[PasswordHasher] = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    global _hasher
+    if _hasher is None:
+        _hasher = PasswordHasher(
+            workers=settings.PASSWORD_HASH_WORKERS,
+            max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+        )
+    return _hasher
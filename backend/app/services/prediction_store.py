@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable
+import logging
+import uuid
+
+from sqlalchemy import Select, and_, delete, event, func, insert, inspect, or_, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Query, Session
+
+from ..db.models import Prediction, PredictionRun, SupersededPredictionRun
+from ..db.upsert import dialect_insert
+from .forecast_cache import get_forecast_cache
+
+
+log = logging.getLogger(__name__)
+
+
+_PENDING_RUNS = "pending_prediction_runs"
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_runs(session: Session) -> None:
+    pending = session.info.pop(_PENDING_RUNS, None)
+    if not pending:
+        return
+    cache = get_forecast_cache()
+    for key, horizon in pending:
+        cache.invalidate(key, horizon)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_runs(session: Session) -> None:
+    session.info.pop(_PENDING_RUNS, None)
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex
+
+
+def forecast_rows(forecast_df) -> list[dict[str, Any]]:
+    """Convert a forecast dataframe (ds, yhat, yhat_lower, yhat_upper) to row dicts."""
+    import pandas as pd
+
+    return [
+        {
+            "ts": pd.to_datetime(row["ds"]).to_pydatetime().replace(tzinfo=None),
+            "yhat": float(row["yhat"]),
+            "yhat_lower": float(row["yhat_lower"]),
+            "yhat_upper": float(row["yhat_upper"]),
+        }
+        for _, row in forecast_df.iterrows()
+    ]
+
+
+def _record_superseded(db: Session, *, key: str, horizon: str, run_id: str) -> None:
+    stmt = dialect_insert(db, SupersededPredictionRun).values(run_id=run_id, loc_key=key, horizon=horizon)
+    db.execute(stmt.on_conflict_do_nothing(index_elements=["run_id"]))
+
+
+def _flip_current_run(db: Session, *, key: str, horizon: str, run_id: str) -> None:
+    # Lock the pointer so concurrent writers record each other's runs as superseded
+    previous = db.execute(
+        select_current_run_id(key=key, horizon=horizon).with_for_update()
+    ).scalar()
+    if previous is not None:
+        db.query(PredictionRun).filter(
+            PredictionRun.loc_key == key, PredictionRun.horizon == horizon
+        ).update({PredictionRun.run_id: run_id}, synchronize_session=False)
+        if previous != run_id:
+            _record_superseded(db, key=key, horizon=horizon, run_id=previous)
+        return
+    try:
+        with db.begin_nested():
+            db.add(PredictionRun(loc_key=key, horizon=horizon, run_id=run_id))
+    except IntegrityError:
+        # Another writer created the pointer first; take it over.
+        previous = db.execute(select_current_run_id(key=key, horizon=horizon).with_for_update()).scalar()
+        db.query(PredictionRun).filter(
+            PredictionRun.loc_key == key, PredictionRun.horizon == horizon
+        ).update({PredictionRun.run_id: run_id}, synchronize_session=False)
+        if previous is not None and previous != run_id:
+            _record_superseded(db, key=key, horizon=horizon, run_id=previous)
+
+
+def write_prediction_set(
+    db: Session,
+    *,
+    key: str,
+    horizon: str,
+    rows: Iterable[dict[str, Any]],
+    ensemble: int,
+    model_versions: dict | None,
+) -> int:
+    """Insert a new prediction set under a fresh run id and make it current.
+
+    Rows of the previous run are left in place so concurrent readers never
+    observe an empty or partial window; they are removed later by
+    ``prune_stale_runs``. The caller owns the transaction: nothing becomes
+    visible until it commits.
+    """
+    run_id = new_run_id()
+    payload = [
+        {
+            **row,
+            "loc_key": key,
+            "horizon": horizon,
+            "run_id": run_id,
+            "ensemble": ensemble,
+            "model_versions": model_versions,
+        }
+        for row in rows
+    ]
+    if payload:
+        db.execute(insert(Prediction), payload)
+    _flip_current_run(db, key=key, horizon=horizon, run_id=run_id)
+    # Cached windows for this location are invalidated once the caller commits
+    db.info.setdefault(_PENDING_RUNS, set()).add((key, horizon))
+    return len(payload)
+
+
+def select_current_run_id(*, key: str, horizon: str) -> Select:
+    return select(PredictionRun.run_id).where(
+        PredictionRun.loc_key == key, PredictionRun.horizon == horizon
+    )
+
+
+def current_run_id(db: Session, *, key: str, horizon: str) -> str | None:
+    return db.execute(select_current_run_id(key=key, horizon=horizon)).scalar()
+
+
+_CURRENT_RUN_JOIN = and_(
+    PredictionRun.run_id == Prediction.run_id,
+    PredictionRun.loc_key == Prediction.loc_key,
+    PredictionRun.horizon == Prediction.horizon,
+)
+
+
+def select_current_predictions(*, key: str, horizon: str) -> Select:
+    """Rows of the current run; pointer and rows are read in one statement."""
+    return (
+        select(Prediction)
+        .join(PredictionRun, _CURRENT_RUN_JOIN)
+        .where(Prediction.loc_key == key, Prediction.horizon == horizon)
+    )
+
+
+def current_predictions(db: Session, *, key: str, horizon: str) -> Query:
+    """Query for rows of the current run, joined through the run pointer."""
+    return (
+        db.query(Prediction)
+        .join(PredictionRun, _CURRENT_RUN_JOIN)
+        .filter(Prediction.loc_key == key, Prediction.horizon == horizon)
+    )
+
+
+def current_prediction_windows(
+    db: Session, windows: Iterable[tuple[str, str, int]]
+) -> dict[tuple[str, str], list[Any]]:
+    """Fetch the first ``limit`` current rows for many (loc_key, horizon, limit) at once.
+
+    One query ranks rows per (loc_key, horizon) with ``row_number()`` so the
+    ``ix_pred_loc_hor_ts`` index drives both the filter and the ordering.
+    """
+    limits: dict[tuple[str, str], int] = {}
+    for key, horizon, limit in windows:
+        limits[(key, horizon)] = max(limits.get((key, horizon), 0), int(limit))
+    if not limits:
+        return {}
+
+    rn = (
+        func.row_number()
+        .over(partition_by=(Prediction.loc_key, Prediction.horizon), order_by=Prediction.ts.asc())
+        .label("rn")
+    )
+    ranked = (
+        select(
+            Prediction.loc_key,
+            Prediction.horizon,
+            Prediction.run_id,
+            Prediction.ts,
+            Prediction.yhat,
+            Prediction.yhat_lower,
+            Prediction.yhat_upper,
+            Prediction.ensemble,
+            Prediction.model_versions,
+            rn,
+        )
+        .join(PredictionRun, _CURRENT_RUN_JOIN)
+        .where(
+            or_(
+                *(
+                    and_(Prediction.loc_key == key, Prediction.horizon == horizon)
+                    for key, horizon in limits
+                )
+            )
+        )
+        .subquery()
+    )
+    stmt = (
+        select(ranked)
+        .where(ranked.c.rn <= max(limits.values()))
+        .order_by(ranked.c.loc_key, ranked.c.horizon, ranked.c.rn)
+    )
+    out: dict[tuple[str, str], list[Any]] = {pair: [] for pair in limits}
+    for row in db.execute(stmt):
+        pair = (row.loc_key, row.horizon)
+        if row.rn <= limits[pair]:
+            out[pair].append(row)
+    return out
+
+
+def prune_stale_runs(db: Session, *, grace: timedelta = timedelta(minutes=10)) -> int:
+    """Delete prediction rows that no longer belong to a current run.
+
+    A run is kept for ``grace`` after it was superseded so readers that
+    resolved the old pointer just before a flip can still finish. Rows of
+    runs that never became current (or pre-date run tracking) fall back to
+    their own ``created_at``.
+    """
+    cutoff = datetime.now(timezone.utc) - grace
+    current = select(PredictionRun.run_id)
+    expired = select(SupersededPredictionRun.run_id).where(SupersededPredictionRun.superseded_at < cutoff)
+    tracked = select(SupersededPredictionRun.run_id)
+    deleted = (
+        db.query(Prediction)
+        .filter(
+            or_(
+                Prediction.run_id.in_(expired),
+                and_(
+                    or_(
+                        Prediction.run_id.is_(None),
+                        and_(Prediction.run_id.not_in(tracked), Prediction.run_id.not_in(current)),
+                    ),
+                    Prediction.created_at < cutoff,
+                ),
+            )
+        )
+        .delete(synchronize_session=False)
+    )
+    db.execute(
+        delete(SupersededPredictionRun)
+        .where(SupersededPredictionRun.superseded_at < cutoff)
+        .where(SupersededPredictionRun.run_id.not_in(current))
+    )
+    db.commit()
+    return int(deleted or 0)
+
+
+def ensure_prediction_runs(db: Session) -> None:
+    """Bring a ``predictions`` table created before run ids up to date.
+
+    ``create_all`` never alters existing tables, so the ``run_id`` column
+    and its indexes are added here. Legacy rows of a (loc_key, horizon)
+    without a run pointer are adopted into one run that is made current, so
+    existing forecasts stay visible until the next retrain.
+    """
+    bind = db.get_bind()
+    table = Prediction.__table__
+    columns = {c["name"] for c in inspect(bind).get_columns(table.name)}
+    if "run_id" not in columns:
+        col_type = table.c.run_id.type.compile(dialect=bind.dialect)
+        db.execute(text(f"ALTER TABLE {table.name} ADD COLUMN run_id {col_type}"))
+        db.commit()
+        log.warning("added predictions.run_id to an existing table")
+    for index in table.indexes:
+        if "run_id" in index.columns:
+            index.create(bind=bind, checkfirst=True)
+
+    legacy = db.execute(
+        select(Prediction.loc_key, Prediction.horizon)
+        .where(Prediction.run_id.is_(None))
+        .where(
+            ~select(PredictionRun.id)
+            .where(PredictionRun.loc_key == Prediction.loc_key, PredictionRun.horizon == Prediction.horizon)
+            .exists()
+        )
+        .distinct()
+    ).all()
+    for key, horizon in legacy:
+        run_id = new_run_id()
+        db.execute(
+            update(Prediction)
+            .where(Prediction.loc_key == key, Prediction.horizon == horizon, Prediction.run_id.is_(None))
+            .values(run_id=run_id)
+        )
+        db.add(PredictionRun(loc_key=key, horizon=horizon, run_id=run_id))
+    db.commit()
+    if legacy:
+        log.warning("adopted legacy predictions for %s (loc_key, horizon) pairs into runs", len(legacy))
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+from threading import Lock
+from typing import Callable, Optional
+import asyncio
+import logging
+import time
+
+from ..core.config import settings
+from ..core.metrics import LatencyStats
+from ..db.session import SessionLocal
+from .recommender import RatingFold, apply_ratings, compose_folds, fold_rating
+
+
+log = logging.getLogger(__name__)
+
+
+def _write_folds(folds: dict[tuple[int, str], RatingFold]) -> int:
+    db = SessionLocal()
+    try:
+        return apply_ratings(db, folds)
+    finally:
+        db.close()
+
+
+class PreferenceBuffer:
+    """Write-behind buffer that coalesces ratings per (user_id, activity_key).
+
+    Ratings are folded in memory with ``fold_rating`` and written every
+    ``flush_interval`` seconds as one executemany upsert, so a burst of
+    ratings on the same activity costs one row write. ``add`` returns False
+    once ``max_pending`` distinct pairs are waiting; callers then write
+    directly. Scores read in the meantime lag by up to one interval.
+
+    ``add`` is called from threadpool handlers, so ``_pending`` is guarded
+    by a lock. A failed flush is folded back in front of newer ratings and
+    retried after an exponential backoff; a pair is dropped (and counted in
+    ``failed``) only after ``max_attempts`` failed flushes, or when a flush
+    during shutdown fails.
+    """
+
+    def __init__(
+        self,
+        *,
+        flush: Callable[[dict[tuple[int, str], RatingFold]], int] = _write_folds,
+        flush_interval: float = 2.0,
+        max_pending: int = 10000,
+        max_attempts: int = 8,
+        retry_backoff: float = 0.5,
+    ):
+        self._flush = flush
+        self.flush_interval = float(flush_interval)
+        self.max_pending = max(1, int(max_pending))
+        self.max_attempts = max(1, int(max_attempts))
+        self.retry_backoff = float(retry_backoff)
+        self._pending: dict[tuple[int, str], RatingFold] = {}
+        self._attempts: dict[tuple[int, str], int] = {}  # failed flushes per pending pair
+        self._lock = Lock()
+        self._retry_delay = 0.0
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.received = 0
+        self.written = 0
+        self.failed = 0
+        self.retried = 0
+        self.flush_latency = LatencyStats()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._closing = False
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="preference-buffer")
+
+    async def stop(self) -> None:
+        """Stop the flush loop after writing everything pending."""
+        if self._task is None:
+            return
+        self._closing = True
+        self._wake.set()
+        await self._task
+        self._task = None
+
+    def add(self, user_id: int, activity_key: str, rating: int) -> bool:
+        if self._closing or not self.running:
+            return False
+        key = (user_id, activity_key)
+        with self._lock:
+            if key not in self._pending and len(self._pending) >= self.max_pending:
+                return False
+            self._pending[key] = fold_rating(self._pending.get(key), rating)
+            self.received += 1
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self._retry_delay or self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                attempts, self._attempts = self._attempts, {}
+            if batch:
+                await self._flush_batch(batch, attempts)
+            if self._closing:
+                with self._lock:
+                    if not self._pending:
+                        return
+
+    async def _flush_batch(
+        self, batch: dict[tuple[int, str], RatingFold], attempts: dict[tuple[int, str], int]
+    ) -> None:
+        started = time.monotonic()
+        try:
+            self.written += await asyncio.to_thread(self._flush, batch)
+            self._retry_delay = 0.0
+            return
+        except Exception:
+            log.exception("preference buffer flush of %s pairs failed", len(batch))
+        finally:
+            self.flush_latency.observe(time.monotonic() - started)
+
+        retry = {}
+        for key in batch:
+            tries = attempts.get(key, 0) + 1
+            if tries < self.max_attempts and not self._closing:
+                retry[key] = tries
+        dropped = len(batch) - len(retry)
+        if dropped:
+            self.failed += dropped
+            log.error("preference buffer dropped %s pairs after failed flushes", dropped)
+        if not retry:
+            self._retry_delay = 0.0
+            return
+        with self._lock:
+            # The failed folds happened first; newer ratings are applied on top
+            for key, tries in retry.items():
+                newer = self._pending.get(key)
+                self._pending[key] = batch[key] if newer is None else compose_folds(batch[key], newer)
+                self._attempts[key] = tries
+        self.retried += len(retry)
+        self._retry_delay = min(self.retry_backoff * 2 ** (max(retry.values()) - 1), 30.0)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "received": self.received,
+            "written": self.written,
+            "failed": self.failed,
+            "retried": self.retried,
+            "flush_latency": self.flush_latency.snapshot(),
+        }
+
+
+_preference_buffer: Optional[PreferenceBuffer] = None
+
+
+def get_preference_buffer() -> PreferenceBuffer:
+    global _preference_buffer
+    if _preference_buffer is None:
+        _preference_buffer = PreferenceBuffer(
+            flush_interval=settings.PREFERENCE_BUFFER_FLUSH_INTERVAL,
+            max_pending=settings.PREFERENCE_BUFFER_MAX_PENDING,
+            max_attempts=settings.PREFERENCE_BUFFER_MAX_ATTEMPTS,
+            retry_backoff=settings.PREFERENCE_BUFFER_RETRY_BACKOFF,
+        )
+    return _preference_buffer
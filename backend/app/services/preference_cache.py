@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from threading import Lock
+from typing import Any, Callable, Iterable, Optional
+import logging
+
+import numpy as np
+
+from ..core.config import settings
+from .cache import TTLCache
+
+
+log = logging.getLogger(__name__)
+
+
+class PreferenceCache:
+    """Per-user preference vectors aligned with a catalog version.
+
+    Entries are keyed by ``(user_id, catalog_version, generation)``. A
+    write bumps the user's generation, so a reader that loaded the old
+    rows before the write committed cannot store them as current.
+
+    Without Redis the generation lives in this process only: other API
+    workers (including the one whose preference buffer flushed) keep
+    serving the old vector for up to ``ttl``. With a Redis client the
+    generation is a shared ``INCR`` counter per user, so a write in any
+    process invalidates every worker. That costs one Redis ``MGET`` per
+    lookup, which blocks the caller. Users whose generation cannot be read
+    are loaded from the database and not cached.
+    """
+
+    def __init__(self, *, maxsize: int = 4096, ttl: float = 60.0, redis_client: Any = None):
+        self._vectors = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generations: dict[int, int] = {}
+        self._lock = Lock()
+        self.redis = redis_client
+
+    @staticmethod
+    def _generation_key(user_id: int) -> str:
+        return f"prefs-gen:{user_id}"
+
+    def generations(self, user_ids: Iterable[int]) -> dict[int, Optional[int]]:
+        ids = list(dict.fromkeys(user_ids))
+        if self.redis is None:
+            return {u: self._generations.get(u, 0) for u in ids}
+        if not ids:
+            return {}
+        try:
+            raw = self.redis.mget([self._generation_key(u) for u in ids])
+        except Exception as e:
+            log.debug("preference cache redis generation failed: %s", e)
+            return {u: None for u in ids}
+        return {u: int(g or 0) for u, g in zip(ids, raw)}
+
+    def generation(self, user_id: int) -> Optional[int]:
+        return self.generations([user_id])[user_id]
+
+    def lookup_many(
+        self, user_ids: Iterable[int], version: str
+    ) -> dict[int, tuple[Optional[int], Optional[np.ndarray]]]:
+        """``{user_id: (generation, vector or None)}``; pass the generation to ``put`` after a miss."""
+        out = {}
+        for user_id, gen in self.generations(user_ids).items():
+            vec = None if gen is None else self._vectors.get((user_id, version, gen))
+            out[user_id] = (gen, vec)
+        return out
+
+    def put(self, user_id: int, version: str, vec: np.ndarray, *, generation: Optional[int]) -> None:
+        """Store a vector loaded under ``generation``; dropped if the user was invalidated since."""
+        vec.setflags(write=False)
+        if generation is None:
+            return
+        if self.redis is None and generation != self._generations.get(user_id, 0):
+            return
+        self._vectors.set((user_id, version, generation), vec)
+
+    def get_or_load(self, user_id: int, version: str, load: Callable[[], np.ndarray]) -> np.ndarray:
+        gen, vec = self.lookup_many([user_id], version)[user_id]
+        if vec is None:
+            vec = load()
+            self.put(user_id, version, vec, generation=gen)
+        return vec
+
+    def invalidate(self, user_ids: Iterable[int]) -> None:
+        ids = set(user_ids)
+        with self._lock:
+            for user_id in ids:
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+        if self.redis is None or not ids:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for user_id in ids:
+                pipe.incr(self._generation_key(user_id))
+            pipe.execute()
+        except Exception as e:
+            log.warning("preference cache redis invalidate failed: %s", e)
+
+    def clear(self) -> None:
+        self._vectors.clear()
+        with self._lock:
+            self._generations.clear()
+
+
+_preference_cache: Optional[PreferenceCache] = None
+
+
+def get_preference_cache() -> PreferenceCache:
+    global _preference_cache
+    if _preference_cache is None:
+        redis_client = None
+        if settings.PREFERENCE_CACHE_REDIS:
+            import redis
+
+            redis_client = redis.Redis.from_url(settings.REDIS_URL)
+        _preference_cache = PreferenceCache(
+            maxsize=settings.PREFERENCE_CACHE_MAX_ENTRIES,
+            ttl=settings.PREFERENCE_CACHE_TTL,
+            redis_client=redis_client,
+        )
+    return _preference_cache
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Optional
+import asyncio
+import logging
+import time
+
+
+log = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, up to ``burst`` stored.
+
+    ``acquire`` waits until a token is available, so callers can simply
+    ``await bucket.acquire()`` before each outbound request. Meant to be used
+    from a single event loop.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = max(1, int(burst))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        # Waiters queue on the lock, so tokens are handed out in arrival order.
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+# Reserves ``want`` tokens and returns how long the caller must wait for
+# them. The balance may go negative: later callers queue behind the debt,
+# so the aggregate rate holds however many processes share the key.
+_RESERVE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local want = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate) - want
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((burst - tokens) / rate) + 60)
+if tokens >= 0 then
+  return '0'
+end
+return tostring(-tokens / rate)
+"""
+
+
+class RedisTokenBucket:
+    """Token bucket shared by every process through one Redis hash.
+
+    Same interface as ``TokenBucket``; the bucket state and clock live in
+    Redis so all Celery worker processes draw from one ``rate``. The client
+    comes from ``client_factory`` (e.g. ``redis.asyncio.Redis.from_url``)
+    and is rebuilt when the running event loop changes. If Redis cannot be
+    reached, ``fallback`` (a per-process bucket) is used and a warning is
+    logged once until Redis answers again.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], Any],
+        *,
+        key: str,
+        rate: float,
+        burst: int = 1,
+        fallback: Optional[TokenBucket] = None,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.key = key
+        self.rate = float(rate)
+        self.capacity = max(1, int(burst))
+        self.fallback = fallback
+        self._factory = client_factory
+        self._client: Any = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._script: Any = None
+        self._degraded = False
+
+    def _script_for_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = self._factory()
+            self._client_loop = loop
+            self._script = self._client.register_script(_RESERVE_SCRIPT)
+        return self._script
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        try:
+            wait = float(await self._script_for_loop()(keys=[self.key], args=[self.rate, self.capacity, tokens]))
+        except Exception as e:
+            if self.fallback is None:
+                raise
+            if not self._degraded:
+                log.warning("shared rate limiter unavailable, using per-process bucket: %s", e)
+                self._degraded = True
+            await self.fallback.acquire(tokens)
+            return
+        self._degraded = False
+        if wait > 0:
+            await asyncio.sleep(wait)
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Iterable, Optional
+import gzip
+
+import orjson
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..db.models import WeatherData, WeatherRawPayload
+
+
+@lru_cache(maxsize=1)
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+@lru_cache(maxsize=1)
+def _zstd_dict():
+    """Shared dictionary from RAW_PAYLOAD_ZSTD_DICT, if configured."""
+    zstd = _zstd()
+    if zstd is None or not settings.RAW_PAYLOAD_ZSTD_DICT:
+        return None
+    with open(settings.RAW_PAYLOAD_ZSTD_DICT, "rb") as f:
+        return zstd.ZstdCompressionDict(f.read())
+
+
+def encode_payload(obj: Any) -> tuple[str, int, bytes]:
+    """Serialize and compress a payload; returns (codec, raw_size, data)."""
+    raw = orjson.dumps(obj)
+    zstd = _zstd()
+    if settings.RAW_PAYLOAD_CODEC == "zstd" and zstd is not None:
+        zdict = _zstd_dict()
+        if zdict is not None:
+            cctx = zstd.ZstdCompressor(level=settings.RAW_PAYLOAD_ZSTD_LEVEL, dict_data=zdict)
+            return f"zstd:{zdict.dict_id()}", len(raw), cctx.compress(raw)
+        cctx = zstd.ZstdCompressor(level=settings.RAW_PAYLOAD_ZSTD_LEVEL)
+        return "zstd", len(raw), cctx.compress(raw)
+    return "gzip", len(raw), gzip.compress(raw, compresslevel=6)
+
+
+def decode_payload(codec: str, data: bytes) -> Any:
+    if codec == "gzip":
+        return orjson.loads(gzip.decompress(data))
+    if codec.startswith("zstd"):
+        zstd = _zstd()
+        if zstd is None:
+            raise RuntimeError("zstandard is required to read zstd payloads")
+        if codec == "zstd":
+            return orjson.loads(zstd.ZstdDecompressor().decompress(data))
+        zdict = _zstd_dict()
+        if zdict is None or codec != f"zstd:{zdict.dict_id()}":
+            raise RuntimeError(f"zstd dictionary for codec {codec!r} is not configured")
+        return orjson.loads(zstd.ZstdDecompressor(dict_data=zdict).decompress(data))
+    raise ValueError(f"unknown payload codec {codec!r}")
+
+
+def store_raw_payloads(db: Session, payloads: Iterable[tuple[int, Any]]) -> int:
+    """Insert compressed payloads for (weather_id, raw) pairs; skips empty ones. Does not commit."""
+    rows = []
+    for weather_id, raw in payloads:
+        if raw is None:
+            continue
+        codec, raw_size, data = encode_payload(raw)
+        rows.append({"weather_id": weather_id, "codec": codec, "raw_size": raw_size, "data": data})
+    if rows:
+        db.execute(insert(WeatherRawPayload), rows)
+    return len(rows)
+
+
+def load_raw_payload(db: Session, weather_id: int) -> Optional[Any]:
+    """Return the decoded payload for an observation, falling back to the legacy column."""
+    stored = db.get(WeatherRawPayload, weather_id)
+    if stored is not None:
+        return decode_payload(stored.codec, stored.data)
+    return db.query(WeatherData.raw_data).filter(WeatherData.id == weather_id).scalar()
@@ -1,9 +1,23 @@
 from __future__ import annotations
 
-from typing import List, Tuple
+from datetime import timedelta
+from typing import Any, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+from sqlalchemy import bindparam, delete, func, inspect, select
 from sqlalchemy.orm import Session
 
-from ..db.models import Activity, UserPreference
+from ..db.models import Activity, HistoricalWeather, Prediction, UserPreference
+from ..db.upsert import dialect_insert
+from ..schemas.recommend import RecommendationScenario
+from .activity_catalog import ActivityCatalog, CompiledActivity, compile_activity, get_activity_catalog
+from .activity_scoring import contiguous_windows, score_weather, top_k_indices
+from .prediction_store import current_predictions
+from .preference_cache import get_preference_cache
+
+
+log = logging.getLogger(__name__)
 
 
 def _to_metric_wind(speed: float, units: str) -> float:
@@ -21,27 +35,30 @@ def _to_metric_temp(temp: float, units: str) -> float:
 
 
 def score_activity(
-    activity: Activity,
+    activity: CompiledActivity | Activity,
     *,
     temp_c: float,
     humidity: float,
     wind_ms: float,
     condition: str,
 ) -> Tuple[float, str]:
+    """Score one activity; reference for the vectorized ``score_weather`` used by ``recommend``."""
+    if not isinstance(activity, CompiledActivity):
+        activity = compile_activity(activity)
     condition_l = condition.lower()
     score = 0.0
     pos_reasons: List[str] = []
     neg_reasons: List[str] = []
 
     # Base score by tags (reduce baseline so weather matters more)
-    tags = [t.lower() for t in (activity.tags or [])]
+    tags = activity.tag_set
     if "indoor" in tags:
         score += 0.1
     if "outdoor" in tags:
         score += 0.2
 
     # Condition matching
-    allowed = [c.lower() for c in (activity.allowed_conditions or [])]
+    allowed = activity.allowed_conditions
     good_condition = False
     if allowed:
         if condition_l in allowed:
@@ -132,52 +149,365 @@ def recommend(
     temp_c = _to_metric_temp(temperature, units)
     wind_ms = _to_metric_wind(wind_speed, units)
 
-    activities = db.query(Activity).all()
+    catalog = get_activity_catalog(db)
+
+    weather = score_weather(
+        catalog.arrays,
+        temp_c=temp_c,
+        humidity=humidity,
+        wind_ms=wind_ms,
+        conditions=[condition],
+    )
+    final = 0.7 * weather[0] + 0.3 * user_preference_vector(db, catalog, user_id)
+    return ranked_results(
+        catalog,
+        final,
+        top_k=max(1, top_k),
+        temp_c=temp_c,
+        humidity=humidity,
+        wind_ms=wind_ms,
+        condition=condition,
+    )
+
+
+def preference_vector(catalog: ActivityCatalog, user_scores: dict[str, float]) -> np.ndarray:
+    """User preference scores aligned with the catalog order (0.0 when unrated)."""
+    return np.array([user_scores.get(a.key, 0.0) for a in catalog.activities], dtype=np.float64)
+
+
+def user_preference_vector(db: Session, catalog: ActivityCatalog, user_id: int | None) -> np.ndarray:
+    """Cached preference vector for ``user_id``; zeros for anonymous requests."""
+    if user_id is None:
+        return np.zeros(len(catalog.activities))
+    return get_preference_cache().get_or_load(
+        user_id, catalog.version, lambda: preference_vector(catalog, _user_scores(db, user_id))
+    )
+
+
+def ranked_results(
+    catalog: ActivityCatalog,
+    final: np.ndarray,
+    *,
+    top_k: int,
+    temp_c: float,
+    humidity: float,
+    wind_ms: float,
+    condition: str,
+) -> List[Tuple[str, str, float, str]]:
+    """Top ``top_k`` (key, label, score, reason) rows for one scenario.
+
+    Reasons come from ``score_activity`` and are only built for the
+    returned items.
+    """
+    out = []
+    for i in top_k_indices(final, top_k):
+        a = catalog.activities[i]
+        _, reason = score_activity(a, temp_c=temp_c, humidity=humidity, wind_ms=wind_ms, condition=condition)
+        out.append((a.key, a.label, float(final[i]), reason))
+    return out
+
 
-    # User preference map
-    user_scores: dict[str, float] = {}
-    if user_id is not None:
-        prefs = (
-            db.query(UserPreference)
-            .filter(UserPreference.user_id == user_id)
-            .all()
+def recommend_batch(
+    db: Session,
+    *,
+    scenarios: Sequence[RecommendationScenario],
+    top_k: int = 5,
+) -> List[List[Tuple[str, str, float, str]]]:
+    """Top-k recommendations for many (user, weather) scenarios, in request order.
+
+    Cached preference vectors are reused and the remaining users are read
+    in one query. Distinct weather
+    snapshots and distinct users are scored once each, then combined into a
+    (scenarios x activities) matrix by indexing, so each scenario gets the
+    same scores ``recommend`` would give it.
+    """
+    catalog = get_activity_catalog(db)
+
+    weather_rows: dict[tuple[float, float, float, str], int] = {}
+    user_rows: dict[int | None, int] = {}
+    w_idx, u_idx = [], []
+    for sc in scenarios:
+        w = (
+            _to_metric_temp(sc.temperature, sc.units),
+            sc.humidity,
+            _to_metric_wind(sc.wind_speed, sc.units),
+            sc.condition,
         )
-        user_scores = {p.activity_key: p.score for p in prefs}
-
-    results = []
-    for a in activities:
-        w_score, reason = score_activity(
-            a,
-            temp_c=temp_c,
-            humidity=humidity,
-            wind_ms=wind_ms,
-            condition=condition,
+        w_idx.append(weather_rows.setdefault(w, len(weather_rows)))
+        u_idx.append(user_rows.setdefault(sc.user_id, len(user_rows)))
+
+    cache = get_preference_cache()
+    vectors: dict[int | None, np.ndarray] = {None: np.zeros(len(catalog.activities))}
+    misses: dict[int, Optional[int]] = {}
+    for u, (gen, vec) in cache.lookup_many((u for u in user_rows if u is not None), catalog.version).items():
+        if vec is None:
+            misses[u] = gen
+        else:
+            vectors[u] = vec
+    if misses:
+        user_scores: dict[int, dict[str, float]] = {u: {} for u in misses}
+        prefs = db.query(UserPreference).filter(UserPreference.user_id.in_(list(misses))).all()
+        for p in prefs:
+            user_scores[p.user_id][p.activity_key] = p.score
+        for u, gen in misses.items():
+            vectors[u] = preference_vector(catalog, user_scores[u])
+            cache.put(u, catalog.version, vectors[u], generation=gen)
+
+    snapshots = list(weather_rows)
+    weather = score_weather(
+        catalog.arrays,
+        temp_c=[w[0] for w in snapshots],
+        humidity=[w[1] for w in snapshots],
+        wind_ms=[w[2] for w in snapshots],
+        conditions=[w[3] for w in snapshots],
+    )
+    prefs_matrix = np.stack([vectors[u] for u in user_rows])
+    final = 0.7 * weather[w_idx] + 0.3 * prefs_matrix[u_idx]
+
+    k = max(1, top_k)
+    out = []
+    for row, wi in zip(final, w_idx):
+        temp_c, humidity, wind_ms, condition = snapshots[wi]
+        out.append(
+            ranked_results(
+                catalog,
+                row,
+                top_k=k,
+                temp_c=temp_c,
+                humidity=humidity,
+                wind_ms=wind_ms,
+                condition=condition,
+            )
         )
-        u_score = user_scores.get(a.key, 0.0)
-        final = 0.7 * w_score + 0.3 * u_score
-        results.append((a.key, a.label, final, reason))
+    return out
 
-    results.sort(key=lambda x: x[2], reverse=True)
-    return results[: max(1, top_k)]
 
+_STEP = {"hourly": timedelta(hours=1), "daily": timedelta(days=1)}
 
-def update_preference(db: Session, *, user_id: int, activity_key: str, rating: int):
+
+def _user_scores(db: Session, user_id: int | None) -> dict[str, float]:
+    if user_id is None:
+        return {}
+    prefs = db.query(UserPreference).filter(UserPreference.user_id == user_id).all()
+    return {p.activity_key: p.score for p in prefs}
+
+
+def recommend_timeline(
+    db: Session,
+    *,
+    key: str,
+    horizon: str,
+    user_id: int | None = None,
+    units: str = "metric",
+    humidity: Optional[float] = None,
+    wind_speed: Optional[float] = None,
+    condition: Optional[str] = None,
+    min_score: float = 0.5,
+    min_steps: int = 1,
+    max_windows: int = 3,
+    top_k: int = 5,
+) -> dict[str, Any]:
+    """Best contiguous forecast windows per activity for a location.
+
+    Every activity is scored against every step of the current ``horizon``
+    prediction run (temperature from ``yhat``) as one (timesteps x
+    activities) matrix. Humidity, wind and condition are not forecast, so
+    they come from the arguments or, when omitted, the latest historical
+    observation. Raises ``LookupError`` when there is no current forecast
+    and ``ValueError`` when the conditions cannot be resolved.
+    """
+    steps = (
+        current_predictions(db, key=key, horizon=horizon)
+        .with_entities(Prediction.ts, Prediction.yhat)
+        .order_by(Prediction.ts.asc())
+        .all()
+    )
+    if not steps:
+        raise LookupError(f"no current {horizon} forecast for {key}")
+
+    wind_ms = None if wind_speed is None else _to_metric_wind(wind_speed, units)
+    source = "request"
+    if humidity is None or wind_ms is None or condition is None:
+        latest = (
+            db.query(HistoricalWeather)
+            .filter(HistoricalWeather.loc_key == key)
+            .order_by(HistoricalWeather.ts.desc())
+            .first()
+        )
+        if latest is None:
+            raise ValueError("humidity, wind_speed and condition are required when there is no observed history")
+        source = "historical"
+        humidity = latest.humidity if humidity is None else humidity
+        wind_ms = latest.wind_speed if wind_ms is None else wind_ms
+        condition = latest.condition if condition is None else condition
+        if humidity is None or wind_ms is None or not condition:
+            raise ValueError("latest observation is missing humidity, wind or condition")
+
+    catalog = get_activity_catalog(db)
+    temps = np.array([row.yhat for row in steps], dtype=np.float64)
+    weather = score_weather(
+        catalog.arrays,
+        temp_c=temps,
+        humidity=np.full(len(temps), humidity),
+        wind_ms=np.full(len(temps), wind_ms),
+        conditions=[condition] * len(temps),
+    )
+    final = (0.7 * weather + 0.3 * user_preference_vector(db, catalog, user_id)).T  # (A, T)
+
+    rows, starts, ends, means = contiguous_windows(final, min_score, min_steps)
+    step = _STEP.get(horizon, timedelta(hours=1))
+    per_activity: dict[int, list[dict[str, Any]]] = {}
+    # Round before ranking so cumsum noise cannot reorder equally good windows
+    for n in np.lexsort((starts, -np.round(means, 9), rows)):
+        a = int(rows[n])
+        chosen = per_activity.setdefault(a, [])
+        if len(chosen) >= max_windows:
+            continue
+        lo, hi = int(starts[n]), int(ends[n])
+        peak = lo + int(np.argmax(final[a, lo:hi]))
+        chosen.append(
+            {
+                "start": steps[lo].ts,
+                "end": steps[hi - 1].ts + step,
+                "steps": hi - lo,
+                "mean_score": round(float(means[n]), 3),
+                "peak_score": round(float(final[a, peak]), 3),
+                "peak_ts": steps[peak].ts,
+            }
+        )
+
+    # Activities ordered by their best window, ties by catalog order
+    best = sorted(per_activity, key=lambda a: (-per_activity[a][0]["mean_score"], a))
+    return {
+        "loc_key": key,
+        "horizon": horizon,
+        "steps": len(steps),
+        "conditions_source": source,
+        "activities": [
+            {
+                "key": catalog.activities[a].key,
+                "label": catalog.activities[a].label,
+                "windows": per_activity[a],
+            }
+            for a in best[: max(1, top_k)]
+        ],
+    }
+
+
+# Weight kept from the previous score on each rating (EMA)
+_EMA_KEEP = 0.7
+
+# (insert score, keep, add): a new row gets the insert score, an existing
+# one becomes ``keep * score + add``
+RatingFold = Tuple[float, float, float]
+
+
+def rating_to_score(rating: int) -> float:
     # rating 1..5 => map to [-1, 1]
     r = max(1, min(5, rating))
-    mapped = (r - 3) / 2  # 1->-1, 3->0, 5->1
-    pref = (
-        db.query(UserPreference)
-        .filter(
-            UserPreference.user_id == user_id,
-            UserPreference.activity_key == activity_key,
-        )
-        .first()
+    return (r - 3) / 2  # 1->-1, 3->0, 5->1
+
+
+def fold_rating(fold: Optional[RatingFold], rating: int) -> RatingFold:
+    """Combine a rating into the pending update for one (user, activity).
+
+    Folding several ratings gives the same result as applying them one by
+    one, so a burst of ratings can be written as a single upsert.
+    """
+    mapped = rating_to_score(rating)
+    if fold is None:
+        return mapped, _EMA_KEEP, (1 - _EMA_KEEP) * mapped
+    insert_score, keep, add = fold
+    return (
+        _EMA_KEEP * insert_score + (1 - _EMA_KEEP) * mapped,
+        _EMA_KEEP * keep,
+        _EMA_KEEP * add + (1 - _EMA_KEEP) * mapped,
     )
-    if pref:
-        # EMA update
-        pref.score = 0.7 * pref.score + 0.3 * mapped
-    else:
-        pref = UserPreference(user_id=user_id, activity_key=activity_key, score=mapped)
-        db.add(pref)
+
+
+def compose_folds(first: RatingFold, then: RatingFold) -> RatingFold:
+    """Fold that applies ``first`` and then ``then`` (both already folded)."""
+    insert_score, keep, add = first
+    then_insert, then_keep, then_add = then
+    return (
+        insert_score * then_keep + then_add,
+        keep * then_keep,
+        add * then_keep + then_add,
+    )
+
+
+def _preference_upsert(db: Session):
+    table = UserPreference.__table__
+    stmt = dialect_insert(db, table).values(
+        user_id=bindparam("p_user_id"),
+        activity_key=bindparam("p_activity_key"),
+        score=bindparam("p_insert"),
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.activity_key],
+        set_={
+            "score": table.c.score * bindparam("p_keep") + bindparam("p_add"),
+            "updated_at": func.now(),
+        },
+    )
+
+
+def _upsert_params(user_id: int, activity_key: str, fold: RatingFold) -> dict[str, Any]:
+    insert_score, keep, add = fold
+    return {
+        "p_user_id": user_id,
+        "p_activity_key": activity_key,
+        "p_insert": insert_score,
+        "p_keep": keep,
+        "p_add": add,
+    }
+
+
+def update_preference(db: Session, *, user_id: int, activity_key: str, rating: int):
+    """Apply one rating as a single atomic upsert and return (user_id, activity_key, score)."""
+    table = UserPreference.__table__
+    stmt = _preference_upsert(db).returning(table.c.user_id, table.c.activity_key, table.c.score)
+    row = db.execute(stmt, _upsert_params(user_id, activity_key, fold_rating(None, rating))).one()
+    db.commit()
+    get_preference_cache().invalidate([user_id])
+    return row
+
+
+def apply_ratings(db: Session, folds: dict[tuple[int, str], RatingFold]) -> int:
+    """Write folded ratings for many (user_id, activity_key) pairs in one executemany and commit."""
+    if not folds:
+        return 0
+    db.execute(
+        _preference_upsert(db),
+        [_upsert_params(user_id, key, fold) for (user_id, key), fold in folds.items()],
+    )
+    db.commit()
+    get_preference_cache().invalidate(user_id for user_id, _ in folds)
+    return len(folds)
+
+
+def fold_ratings(ratings) -> dict[tuple[int, str], RatingFold]:
+    """Fold (user_id, activity_key, rating) triples, in order, per pair."""
+    folds: dict[tuple[int, str], RatingFold] = {}
+    for user_id, key, rating in ratings:
+        folds[(user_id, key)] = fold_rating(folds.get((user_id, key)), rating)
+    return folds
+
+
+def ensure_unique_preferences(db: Session) -> None:
+    """Add the (user_id, activity_key) unique index to a pre-existing table.
+
+    Duplicates left by the old select-then-insert path are collapsed onto
+    the lowest id first, the row that path kept updating. Nothing is
+    scanned when the index already exists.
+    """
+    index = next(i for i in UserPreference.__table__.indexes if i.name == "uq_user_pref_user_activity")
+    bind = db.get_bind()
+    if any(i["name"] == index.name for i in inspect(bind).get_indexes(UserPreference.__tablename__)):
+        return
+    keep = select(func.min(UserPreference.id)).group_by(UserPreference.user_id, UserPreference.activity_key)
+    removed = db.execute(delete(UserPreference).where(UserPreference.id.not_in(keep))).rowcount
     db.commit()
-    return pref
+    if removed:
+        log.warning("removed %s duplicate user preference rows", removed)
+    index.create(bind=bind, checkfirst=True)
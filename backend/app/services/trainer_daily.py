@@ -5,8 +5,9 @@ import pandas as pd
 import numpy as np
 from sqlalchemy.orm import Session
 
-from ..db.models import HistoricalWeather, Prediction, ModelRegistry
+from ..db.models import HistoricalWeather, ModelRegistry
 from .historical import loc_key_from_latlon
+from .prediction_store import forecast_rows, write_prediction_set
 
 
 def _load_daily_series(db: Session, *, key: str) -> pd.DataFrame:
@@ -101,26 +102,15 @@ def train_daily(db: Session, *, lat: float, lon: float, days: int = 7) -> int:
 
     forecast_df, metrics = _fit_ets_forecast(daily, horizon_days=days)
 
-    # Remove existing daily predictions for this key
-    db.query(Prediction).filter(
-        Prediction.loc_key == key, Prediction.horizon == "daily"
-    ).delete()
-
-    # Insert predictions
-    inserted = 0
-    for _, row in forecast_df.iterrows():
-        p = Prediction(
-            loc_key=key,
-            horizon="daily",
-            ts=pd.to_datetime(row["ds"]).to_pydatetime().replace(tzinfo=None),
-            yhat=float(row["yhat"]),
-            yhat_lower=float(row["yhat_lower"]),
-            yhat_upper=float(row["yhat_upper"]),
-            ensemble=0,
-            model_versions={"daily": "ets_v1"},
-        )
-        db.add(p)
-        inserted += 1
+    # Write a new prediction set and flip the current-run pointer
+    inserted = write_prediction_set(
+        db,
+        key=key,
+        horizon="daily",
+        rows=forecast_rows(forecast_df),
+        ensemble=0,
+        model_versions={"daily": "ets_v1"},
+    )
 
     # Update registry
     reg = ModelRegistry(
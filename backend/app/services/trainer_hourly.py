@@ -5,8 +5,9 @@ import pandas as pd
 import numpy as np
 from sqlalchemy.orm import Session
 
-from ..db.models import HistoricalWeather, Prediction, ModelRegistry
+from ..db.models import HistoricalWeather, ModelRegistry
 from .historical import loc_key_from_latlon
+from .prediction_store import forecast_rows, write_prediction_set
 
 
 def _load_hourly_series(db: Session, *, key: str) -> pd.DataFrame:
@@ -74,25 +75,15 @@ def train_hourly(db: Session, *, lat: float, lon: float, hours: int = 48) -> int
 
     forecast_df, metrics = _fit_ets_hourly(hourly, horizon_hours=hours)
 
-    # Remove existing hourly predictions for this key
-    db.query(Prediction).filter(
-        Prediction.loc_key == key, Prediction.horizon == "hourly"
-    ).delete()
-
-    inserted = 0
-    for _, row in forecast_df.iterrows():
-        p = Prediction(
-            loc_key=key,
-            horizon="hourly",
-            ts=pd.to_datetime(row["ds"]).to_pydatetime().replace(tzinfo=None),
-            yhat=float(row["yhat"]),
-            yhat_lower=float(row["yhat_lower"]),
-            yhat_upper=float(row["yhat_upper"]),
-            ensemble=0,
-            model_versions={"hourly": "ets_v1"},
-        )
-        db.add(p)
-        inserted += 1
+    # Write a new prediction set and flip the current-run pointer
+    inserted = write_prediction_set(
+        db,
+        key=key,
+        horizon="hourly",
+        rows=forecast_rows(forecast_df),
+        ensemble=0,
+        model_versions={"hourly": "ets_v1"},
+    )
 
     reg = ModelRegistry(
         loc_key=key,
@@ -6,8 +6,9 @@ import numpy as np
 import pandas as pd
 from sqlalchemy.orm import Session
 
-from ..db.models import HistoricalWeather, Prediction, ModelRegistry
+from ..db.models import HistoricalWeather, ModelRegistry
 from .historical import loc_key_from_latlon
+from .prediction_store import write_prediction_set
 
 
 def _load_hourly_series(db: Session, *, key: str) -> pd.Series:
@@ -117,25 +118,24 @@ def train_hourly(db: Session, *, lat: float, lon: float, hours: int = 48) -> int
     model.save(model_path)
     joblib.dump(scaler, scaler_path)
 
-    # Store predictions
-    db.query(Prediction).filter(
-        Prediction.loc_key == key, Prediction.horizon == "hourly"
-    ).delete()
-
-    inserted = 0
-    for ts, yhat, lo, up in zip(future_index, preds_arr, lower, upper):
-        p = Prediction(
-            loc_key=key,
-            horizon="hourly",
-            ts=pd.to_datetime(ts).to_pydatetime().replace(tzinfo=None),
-            yhat=float(yhat),
-            yhat_lower=float(lo),
-            yhat_upper=float(up),
-            ensemble=0,
-            model_versions={"hourly": "lstm_v1"},
-        )
-        db.add(p)
-        inserted += 1
+    # Store predictions as a new set and flip the current-run pointer
+    rows = [
+        {
+            "ts": pd.to_datetime(ts).to_pydatetime().replace(tzinfo=None),
+            "yhat": float(yhat),
+            "yhat_lower": float(lo),
+            "yhat_upper": float(up),
+        }
+        for ts, yhat, lo, up in zip(future_index, preds_arr, lower, upper)
+    ]
+    inserted = write_prediction_set(
+        db,
+        key=key,
+        horizon="hourly",
+        rows=rows,
+        ensemble=0,
+        model_versions={"hourly": "lstm_v1"},
+    )
 
     reg = ModelRegistry(
         loc_key=key,
@@ -1,10 +1,66 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, Optional
+import asyncio
+import logging
+
 import httpx
 
 from ..core.config import settings
+from ..schemas.weather import WeatherIngest
+from .rate_limit import RedisTokenBucket, TokenBucket
+
+
+log = logging.getLogger(__name__)
+
+
+# Long-lived pooled client, bound to the event loop that opened it
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_bucket: Optional[TokenBucket | RedisTokenBucket] = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def build_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=settings.OPENWEATHER_BASE_URL,
+        timeout=httpx.Timeout(settings.OPENWEATHER_TIMEOUT, connect=settings.OPENWEATHER_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=settings.OPENWEATHER_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OPENWEATHER_MAX_KEEPALIVE,
+            keepalive_expiry=settings.OPENWEATHER_KEEPALIVE_EXPIRY,
+        ),
+        http2=settings.OPENWEATHER_HTTP2 and _http2_available(),
+    )
+
+
+async def open_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it for the running loop if needed."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        # Connections cannot move between loops, so a new loop gets a new pool.
+        _client = build_client()
+        _client_loop = loop
+    return _client
+
 
+async def close_client() -> None:
+    global _client, _client_loop
+    if _client is not None and _client_loop is asyncio.get_running_loop():
+        await _client.aclose()
+    _client = None
+    _client_loop = None
 
-async def fetch_current_weather(lat: float, lon: float, units: str = "metric") -> Dict[str, Any]:
+
+async def fetch_current_weather(
+    lat: float, lon: float, units: str = "metric", *, client: Optional[httpx.AsyncClient] = None
+) -> Dict[str, Any]:
     if not settings.OPENWEATHER_API_KEY:
         raise RuntimeError("OPENWEATHER_API_KEY not configured")
     params = {
@@ -13,8 +69,86 @@ async def fetch_current_weather(lat: float, lon: float, units: str = "metric") -
         "appid": settings.OPENWEATHER_API_KEY,
         "units": units,
     }
-    async with httpx.AsyncClient(timeout=15) as client:
-        r = await client.get("https://api.openweathermap.org/data/2.5/weather", params=params)
-        r.raise_for_status()
-        return r.json()
+    client = client or await open_client()
+    r = await client.get("/data/2.5/weather", params=params)
+    r.raise_for_status()
+    return r.json()
+
+
+def get_rate_limiter() -> TokenBucket | RedisTokenBucket:
+    """Bucket for OpenWeather calls.
+
+    With ``OPENWEATHER_RATE_LIMIT_REDIS`` (the default) the quota is shared
+    by every worker process through Redis; otherwise it is per process, so
+    the configured rate must be divided by the worker concurrency.
+    """
+    global _bucket
+    if _bucket is None:
+        local = TokenBucket(settings.OPENWEATHER_RATE_PER_SEC, settings.OPENWEATHER_RATE_BURST)
+        if settings.OPENWEATHER_RATE_LIMIT_REDIS:
+            import redis.asyncio
+
+            _bucket = RedisTokenBucket(
+                lambda: redis.asyncio.Redis.from_url(settings.REDIS_URL),
+                key="ratelimit:openweather",
+                rate=settings.OPENWEATHER_RATE_PER_SEC,
+                burst=settings.OPENWEATHER_RATE_BURST,
+                fallback=local,
+            )
+        else:
+            _bucket = local
+    return _bucket
+
+
+def observation_from_payload(payload: Dict[str, Any], name: Optional[str] = None) -> WeatherIngest:
+    """Map an OpenWeather current-weather response to an ingest record."""
+    main = payload.get("main") or {}
+    coord = payload.get("coord") or {}
+    conditions = payload.get("weather") or [{}]
+    return WeatherIngest(
+        location_name=name or payload.get("name") or None,
+        latitude=coord.get("lat"),
+        longitude=coord.get("lon"),
+        temperature=main.get("temp"),
+        humidity=main.get("humidity"),
+        pressure=main.get("pressure"),
+        weather_condition=conditions[0].get("main"),
+        raw_data=payload,
+    )
+
+
+async def fetch_many(
+    locations: Iterable[Dict[str, Any]],
+    units: str = "metric",
+    *,
+    client: Optional[httpx.AsyncClient] = None,
+    limiter: Optional[TokenBucket | RedisTokenBucket] = None,
+    concurrency: Optional[int] = None,
+) -> tuple[list[WeatherIngest], list[Dict[str, Any]]]:
+    """Fetch current weather for many ``{"lat", "lon", "name"?}`` locations concurrently.
+
+    Requests go through the token bucket and at most ``concurrency`` are in
+    flight at once. Returns ``(observations, failures)``; one failing
+    location does not fail the batch.
+    """
+    client = client or await open_client()
+    limiter = limiter or get_rate_limiter()
+    sem = asyncio.Semaphore(concurrency or settings.OPENWEATHER_BATCH_CONCURRENCY)
+
+    async def _one(loc: Dict[str, Any]) -> WeatherIngest:
+        async with sem:
+            await limiter.acquire()
+            payload = await fetch_current_weather(loc["lat"], loc["lon"], units, client=client)
+        return observation_from_payload(payload, loc.get("name"))
 
+    locations = list(locations)
+    results = await asyncio.gather(*(_one(loc) for loc in locations), return_exceptions=True)
+    observations: list[WeatherIngest] = []
+    failures: list[Dict[str, Any]] = []
+    for loc, res in zip(locations, results):
+        if isinstance(res, BaseException):
+            log.warning("weather fetch failed for %s: %s", loc, res)
+            failures.append({**loc, "error": str(res)})
+        else:
+            observations.append(res)
+    return observations, failures
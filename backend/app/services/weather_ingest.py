@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from ..db.models import LatestWeather, WeatherData
+from ..db.upsert import dialect_insert
+from ..schemas.weather import WeatherIngest
+from .raw_payloads import store_raw_payloads
+
+
+_LATEST_FIELDS = (
+    "latitude",
+    "longitude",
+    "timestamp",
+    "temperature",
+    "humidity",
+    "pressure",
+    "weather_condition",
+)
+
+
+def upsert_latest(db: Session, rows: Iterable[dict[str, Any]]) -> int:
+    """Upsert ``latest_weather`` from inserted observation rows.
+
+    Each row needs ``id``, ``location_name`` and the observation fields.
+    Rows without a location are skipped, and an older observation never
+    replaces a newer one. Does not commit.
+    """
+    newest: dict[str, dict[str, Any]] = {}
+    for row in rows:
+        name = row.get("location_name")
+        if not name:
+            continue
+        cur = newest.get(name)
+        if cur is None or (row["timestamp"], row["id"]) >= (cur["timestamp"], cur["id"]):
+            newest[name] = row
+    if not newest:
+        return 0
+
+    values = [
+        {"location_name": name, "weather_id": row["id"], **{f: row.get(f) for f in _LATEST_FIELDS}}
+        for name, row in newest.items()
+    ]
+    stmt = dialect_insert(db, LatestWeather)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[LatestWeather.location_name],
+        set_={"weather_id": stmt.excluded.weather_id, **{f: getattr(stmt.excluded, f) for f in _LATEST_FIELDS}},
+        where=stmt.excluded.timestamp >= LatestWeather.timestamp,
+    )
+    db.execute(stmt, values)
+    return len(values)
+
+
+def bulk_insert_observations(db: Session, records: Sequence[WeatherIngest]) -> int:
+    """Write many observations with one executemany INSERT and commit.
+
+    No rows are refreshed afterwards; callers get back a count only. The
+    generated ids and timestamps come back via RETURNING to store raw
+    payloads and maintain ``latest_weather`` in the same transaction.
+    """
+    rows = [r.model_dump(exclude={"raw_data"}) for r in records]
+    if not rows:
+        return 0
+    returned = db.execute(
+        insert(WeatherData).returning(
+            WeatherData.id, WeatherData.timestamp, sort_by_parameter_order=True
+        ),
+        rows,
+    ).all()
+    store_raw_payloads(db, ((ret.id, r.raw_data) for r, ret in zip(records, returned)))
+    upsert_latest(
+        db,
+        ({**row, "id": ret.id, "timestamp": ret.timestamp} for row, ret in zip(rows, returned)),
+    )
+    db.commit()
+    return len(rows)
+
+
+def ensure_weather_indexes(db: Session) -> None:
+    """Create ``ix_weather_loc_ts`` on a ``weather_data`` table that pre-dates it (``create_all`` skips existing tables)."""
+    index = next(i for i in WeatherData.__table__.indexes if i.name == "ix_weather_loc_ts")
+    index.create(bind=db.get_bind(), checkfirst=True)
+
+
+def ensure_latest_populated(db: Session) -> int:
+    """Seed ``latest_weather`` from ``weather_data`` when the table is empty."""
+    if db.query(LatestWeather.location_name).first() is not None:
+        return 0
+    rn = (
+        func.row_number()
+        .over(
+            partition_by=WeatherData.location_name,
+            order_by=(WeatherData.timestamp.desc(), WeatherData.id.desc()),
+        )
+        .label("rn")
+    )
+    ranked = (
+        select(WeatherData.id, WeatherData.location_name, *(getattr(WeatherData, f) for f in _LATEST_FIELDS), rn)
+        .where(WeatherData.location_name.is_not(None))
+        .subquery()
+    )
+    rows = db.execute(select(ranked).where(ranked.c.rn == 1)).mappings().all()
+    count = upsert_latest(db, (dict(r) for r in rows))
+    db.commit()
+    return count
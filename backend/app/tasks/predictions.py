@@ -8,6 +8,9 @@ from ..services.historical import backfill_historical, loc_key_from_latlon
 from ..services.trainer_daily import train_daily as ets_train_daily
 from ..services.trainer_hourly import train_hourly as ets_train_hourly
 from ..services.ensemble import build_daily_ensemble, build_hourly_ensemble
+from ..services.prediction_store import prune_stale_runs
+from ..services.live_history import history_is_fresh
+from ..core.config import settings
 
 # Optional heavy trainers; import lazily
 try:
@@ -21,6 +24,19 @@ except Exception:  # pragma: no cover
     lstm_train_hourly = None  # type: ignore
 
 
+def _ensure_history(db, lat: float, lon: float) -> None:
+    """Backfill from the archive unless live collection keeps the series current."""
+    import datetime as _dt
+
+    key = loc_key_from_latlon(lat, lon)
+    if history_is_fresh(db, key, max_age=_dt.timedelta(hours=settings.HISTORY_FRESH_HOURS)):
+        return
+    try:
+        backfill_historical(db, lat=lat, lon=lon, months=6)
+    except Exception:
+        pass
+
+
 @celery_app.task(name="app.tasks.predictions.backfill")
 def backfill(lat: float, lon: float, months: int = 12) -> dict:
     db = SessionLocal()
@@ -36,10 +52,7 @@ def train_daily(lat: float, lon: float, days: int = 7, model: str = "prophet") -
     db = SessionLocal()
     try:
         # Ensure we have enough history (safe to call; upserts prevent duplicates)
-        try:
-            backfill_historical(db, lat=lat, lon=lon, months=6)
-        except Exception:
-            pass
+        _ensure_history(db, lat, lon)
         if model == "prophet" and prophet_train_daily is not None:
             inserted = prophet_train_daily(db, lat=lat, lon=lon, days=days)
             used = "prophet"
@@ -61,10 +74,7 @@ def train_hourly(lat: float, lon: float, hours: int = 48, model: str = "lstm") -
     db = SessionLocal()
     try:
         # Ensure we have enough history first (>= 168 points)
-        try:
-            backfill_historical(db, lat=lat, lon=lon, months=6)
-        except Exception:
-            pass
+        _ensure_history(db, lat, lon)
         if model == "lstm" and lstm_train_hourly is not None:
             inserted = lstm_train_hourly(db, lat=lat, lon=lon, hours=hours)
             used = "lstm"
@@ -135,3 +145,16 @@ def maintenance() -> dict:
         db2.close()
 
     return {"scheduled": count, "retention": {"hourly_days": 10, "daily_days": 60}}
+
+
+@celery_app.task(name="app.tasks.predictions.gc_runs")
+def gc_runs(grace_minutes: int = 10) -> dict:
+    """Remove prediction rows superseded by a newer run."""
+    import datetime as _dt
+
+    db = SessionLocal()
+    try:
+        deleted = prune_stale_runs(db, grace=_dt.timedelta(minutes=grace_minutes))
+        return {"status": "ok", "deleted": deleted}
+    finally:
+        db.close()
@@ -1,9 +1,98 @@
 from ..celery_app import celery_app
-from ..services.weather_collector import fetch_current_weather
+from ..db.session import SessionLocal
+from ..services.current_weather_cache import get_current_weather
+from ..services.weather_collector import fetch_many, open_client, close_client
+from ..services.weather_ingest import bulk_insert_observations
+from ..services.live_history import (
+    append_history,
+    history_row_from_payload,
+    latlon_from_loc_key,
+    tracked_loc_keys,
+)
+from ..core.config import settings
+from celery.signals import worker_process_init, worker_process_shutdown
+from typing import Any, Coroutine, Dict, List, Optional
 import asyncio
 
 
+# One event loop per worker process so the pooled HTTP client (and its
+# keep-alive connections) survives across tasks. Assumes the prefork or
+# solo pool, where a process runs one task at a time.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        _loop.run_until_complete(open_client())
+    return _loop
+
+
+def run_async(coro: Coroutine[Any, Any, Any]) -> Any:
+    return _get_loop().run_until_complete(coro)
+
+
+@worker_process_init.connect
+def _init_worker_loop(**_):
+    _get_loop()
+
+
+@worker_process_shutdown.connect
+def _close_worker_loop(**_):
+    global _loop
+    if _loop is None or _loop.is_closed():
+        return
+    try:
+        _loop.run_until_complete(close_client())
+    finally:
+        _loop.close()
+        _loop = None
+
+
 @celery_app.task
 def collect_current_weather(lat: float, lon: float, units: str = "metric"):
-    return asyncio.run(fetch_current_weather(lat, lon, units))
+    return run_async(get_current_weather(lat, lon, units))
+
+
+@celery_app.task
+def collect_current_weather_batch(locations: List[Dict[str, Any]], units: str = "metric"):
+    """Fetch many ``{"lat", "lon", "name"?}`` locations in one task and bulk-write them."""
+    observations, failures = run_async(fetch_many(locations, units))
+    inserted = 0
+    if observations:
+        db = SessionLocal()
+        try:
+            inserted = bulk_insert_observations(db, observations)
+        finally:
+            db.close()
+    return {
+        "requested": len(locations),
+        "inserted": inserted,
+        "failed": len(failures),
+        "failures": failures[:20],
+    }
+
+
+@celery_app.task(name="app.tasks.weather.collect_tracked_history")
+def collect_tracked_history(max_locations: Optional[int] = None):
+    """Poll current weather for tracked locations and append it to historical_weather."""
+    db = SessionLocal()
+    try:
+        keys = tracked_loc_keys(db, limit=max_locations or settings.HISTORY_COLLECT_MAX_LOCATIONS)
+        locations = []
+        for key in keys:
+            try:
+                lat, lon = latlon_from_loc_key(key)
+            except ValueError:
+                continue
+            locations.append({"lat": lat, "lon": lon, "name": key})
+        if not locations:
+            return {"tracked": 0, "inserted": 0, "failed": 0}
 
+        observations, failures = run_async(fetch_many(locations, "metric"))
+        rows = [history_row_from_payload(o.location_name, o.raw_data) for o in observations]
+        inserted = append_history(db, (r for r in rows if r is not None))
+        return {"tracked": len(locations), "inserted": inserted, "failed": len(failures)}
+    finally:
+        db.close()
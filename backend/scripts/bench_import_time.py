@@ -0,0 +1,145 @@
+"""Measure API cold-start import time and guard it against regressions.
+
+Imports ``app.main`` in fresh interpreters under ``-X importtime`` and
+compares the median against a baseline measured in the same run: a bare
+import of the third-party stack the API cannot start without. The script
+exits non-zero when the ratio exceeds the budget, or when a module that
+should load lazily (scientific stack, trainers, Celery) is pulled in at
+startup. ``tests/test_import_time.py`` runs the same checks under pytest.
+
+Usage (from backend/):  python scripts/bench_import_time.py [--budget-ratio 1.5] [--runs 5]
+"""
+from __future__ import annotations
+
+from pathlib import Path
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+TARGET = "app.main"
+
+# Imported by app.main no matter what; the budget is relative to these
+BASELINE = (
+    "fastapi",
+    "sqlalchemy.orm",
+    "sqlalchemy.ext.asyncio",
+    "pydantic_settings",
+    "httpx",
+    "orjson",
+    "passlib.context",
+    "jose",
+    "numpy",
+)
+
+# Must not be imported by the API process until a handler needs them
+LAZY_MODULES = (
+    "pandas",
+    "meteostat",
+    "celery",
+    "app.celery_app",
+    "app.services.historical",
+    "app.services.trainer_daily",
+    "app.services.trainer_hourly",
+    "app.services.trainer_prophet",
+    "app.services.trainer_lstm",
+    "app.services.ensemble",
+)
+
+DEFAULT_BUDGET_RATIO = 1.5
+
+
+def import_once(modules: tuple[str, ...]) -> tuple[float, dict[str, int], list[str]]:
+    """Import ``modules`` in a fresh interpreter.
+
+    Returns (total ms, {module: cumulative us}, lazy modules that got loaded).
+    """
+    probe = f"import sys, {', '.join(modules)}; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        capture_output=True,
+        text=True,
+        cwd=BACKEND_DIR,
+        check=True,
+    )
+    cumulative: dict[str, int] = {}
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue  # header row
+        name = parts[2].rstrip()
+        us = int(parts[1])
+        if not name.startswith("  "):
+            total_us += us  # top-level import; nested ones are part of its cumulative time
+        cumulative[name.strip()] = us
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return total_us / 1000, cumulative, loaded
+
+
+def measure(runs: int = 5) -> dict:
+    """Median import time of ``app.main`` and of the baseline, interleaved to share machine noise."""
+    import_once((TARGET,))  # warm the bytecode cache so runs measure imports, not compilation
+    target_ms: list[float] = []
+    baseline_ms: list[float] = []
+    eager: set[str] = set()
+    last: dict[str, int] = {}
+    for _ in range(max(1, runs)):
+        ms, _, _ = import_once(BASELINE)
+        baseline_ms.append(ms)
+        ms, last, loaded = import_once((TARGET,))
+        target_ms.append(ms)
+        eager.update(loaded)
+    target = statistics.median(target_ms)
+    baseline = statistics.median(baseline_ms)
+    return {
+        "target_ms": target,
+        "baseline_ms": baseline,
+        "ratio": target / baseline if baseline else float("inf"),
+        "eager": sorted(eager),
+        "cumulative": last,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--budget-ratio",
+        type=float,
+        default=float(os.environ.get("IMPORT_TIME_BUDGET_RATIO", DEFAULT_BUDGET_RATIO)),
+        help="fail when app.main takes more than this times the baseline (env: IMPORT_TIME_BUDGET_RATIO)",
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="heaviest modules to list")
+    args = parser.parse_args()
+
+    result = measure(args.runs)
+    print(
+        f"{TARGET}: median {result['target_ms']:.1f} ms, baseline {result['baseline_ms']:.1f} ms, "
+        f"ratio {result['ratio']:.2f} (budget {args.budget_ratio:.2f})"
+    )
+    print("heaviest top-level imports (cumulative, last run):")
+    top_level = {m: us for m, us in result["cumulative"].items() if "." not in m or m.startswith("app.")}
+    for name, us in sorted(top_level.items(), key=lambda kv: kv[1], reverse=True)[: args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if result["eager"]:
+        print(f"FAIL: imported at startup but should be lazy: {', '.join(result['eager'])}")
+        failed = True
+    if result["ratio"] > args.budget_ratio:
+        print(f"FAIL: ratio {result['ratio']:.2f} exceeds budget {args.budget_ratio:.2f}")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""Measure weather_data size and scan time with inline vs offloaded raw payloads.
+
+Builds two throwaway sqlite databases with the same observations: one
+storing the OpenWeather JSON inline in weather_data.raw_data (old layout),
+one storing it compressed in weather_raw_payloads (current layout), and,
+when zstandard is installed, the same with a trained shared dictionary. Reports
+per-table size (sqlite dbstat) and the time of the queries /weather/latest
+runs, which never read the payload.
+
+Usage (from backend/):  python scripts/bench_raw_payloads.py [rows]
+"""
+from __future__ import annotations
+
+import datetime as dt
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+import orjson
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.core.config import settings  # noqa: E402
+from app.services import raw_payloads  # noqa: E402
+from app.services.raw_payloads import encode_payload  # noqa: E402
+
+
+SCHEMA = """
+CREATE TABLE weather_data (
+    id INTEGER PRIMARY KEY,
+    location_name VARCHAR(255),
+    latitude FLOAT, longitude FLOAT,
+    timestamp DATETIME,
+    temperature FLOAT, humidity FLOAT, pressure FLOAT,
+    weather_condition VARCHAR(100),
+    raw_data JSON
+);
+CREATE INDEX ix_weather_loc_ts ON weather_data (location_name, timestamp);
+CREATE INDEX ix_weather_data_timestamp ON weather_data (timestamp);
+CREATE TABLE weather_raw_payloads (
+    weather_id INTEGER PRIMARY KEY REFERENCES weather_data(id),
+    codec VARCHAR(32) NOT NULL, raw_size INTEGER NOT NULL, data BLOB NOT NULL
+);
+"""
+
+
+def _payload(i: int, lat: float, lon: float, temp: float) -> dict:
+    return {
+        "coord": {"lon": lon, "lat": lat},
+        "weather": [{"id": 803, "main": "Clouds", "description": "broken clouds", "icon": "04d"}],
+        "base": "stations",
+        "main": {
+            "temp": temp, "feels_like": temp - 1.2, "temp_min": temp - 2, "temp_max": temp + 2,
+            "pressure": 1013, "humidity": 60 + i % 30, "sea_level": 1013, "grnd_level": 1001,
+        },
+        "visibility": 10000,
+        "wind": {"speed": 3.6, "deg": 250, "gust": 7.2},
+        "clouds": {"all": 75},
+        "dt": 1700000000 + i * 600,
+        "sys": {"type": 2, "id": 2000000 + i % 50, "country": "CA", "sunrise": 1699990000, "sunset": 1700030000},
+        "timezone": -18000,
+        "id": 6077243 + i % 50,
+        "name": f"City {i % 50}",
+        "cod": 200,
+    }
+
+
+def _build(path: str, rows: int, offload: bool) -> None:
+    rnd = random.Random(42)
+    con = sqlite3.connect(path)
+    con.executescript(SCHEMA)
+    base = dt.datetime(2025, 1, 1)
+    data, payloads = [], []
+    for i in range(rows):
+        lat, lon = 45 + (i % 50) * 0.1, -73 - (i % 50) * 0.1
+        temp = round(rnd.uniform(-10, 30), 2)
+        raw = _payload(i, lat, lon, temp)
+        ts = (base + dt.timedelta(minutes=10 * i)).isoformat(" ")
+        inline = None if offload else orjson.dumps(raw).decode()
+        data.append((i + 1, f"City {i % 50}", lat, lon, ts, temp, 60.0, 1013.0, "Clouds", inline))
+        if offload:
+            codec, raw_size, blob = encode_payload(raw)
+            payloads.append((i + 1, codec, raw_size, blob))
+    con.executemany("INSERT INTO weather_data VALUES (?,?,?,?,?,?,?,?,?,?)", data)
+    con.executemany("INSERT INTO weather_raw_payloads VALUES (?,?,?,?)", payloads)
+    con.commit()
+    con.execute("VACUUM")
+    con.close()
+
+
+def _use_trained_dict(tmp: str) -> None:
+    """Train a zstd dictionary on sample payloads and make encode_payload use it."""
+    zstd = raw_payloads._zstd()
+    samples = [orjson.dumps(_payload(i, 45.0, -73.0, 10.0 + i % 17)) for i in range(2000)]
+    path = os.path.join(tmp, "payloads.zdict")
+    with open(path, "wb") as f:
+        f.write(zstd.train_dictionary(16 * 1024, samples).as_bytes())
+    settings.RAW_PAYLOAD_ZSTD_DICT = path
+    raw_payloads._zstd_dict.cache_clear()
+
+
+def _sizes(con: sqlite3.Connection) -> dict:
+    return dict(con.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall())
+
+
+def _time(con: sqlite3.Connection, sql: str, params=(), repeat: int = 20) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        con.execute(sql, params).fetchall()
+        best = min(best, time.perf_counter() - t)
+    return best * 1e3
+
+
+def main() -> None:
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    queries = {
+        "latest 10 (all)": (
+            "SELECT id, location_name, latitude, longitude, temperature, humidity, pressure, "
+            "weather_condition FROM weather_data ORDER BY timestamp DESC LIMIT 10", ()),
+        "latest 10 (one location)": (
+            "SELECT id, location_name, latitude, longitude, temperature, humidity, pressure, "
+            "weather_condition FROM weather_data WHERE location_name = ? "
+            "ORDER BY timestamp DESC LIMIT 10", ("City 7",)),
+        "full scan avg(temp)": ("SELECT AVG(temperature) FROM weather_data", ()),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        layouts = [("inline", False), ("offloaded", True)]
+        if raw_payloads._zstd() is not None:
+            layouts.append(("offloaded+dict", True))
+        results = {}
+        for label, offload in layouts:
+            if label == "offloaded+dict":
+                _use_trained_dict(tmp)
+            path = os.path.join(tmp, f"{label}.db")
+            _build(path, rows, offload)
+            con = sqlite3.connect(path)
+            sizes = _sizes(con)
+            results[label] = {
+                "weather_data KB": sizes.get("weather_data", 0) / 1024,
+                "payloads KB": sizes.get("weather_raw_payloads", 0) / 1024,
+                "file KB": os.path.getsize(path) / 1024,
+                **{f"{q} ms": _time(con, sql, params) for q, (sql, params) in queries.items()},
+            }
+            con.close()
+
+    print(f"rows={rows}")
+    print(f"{'metric':<32}" + "".join(f"{label:>16}" for label in results))
+    for metric in results["inline"]:
+        print(f"{metric:<32}" + "".join(f"{r[metric]:>16.2f}" for r in results.values()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark response serialization and compression for forecast payloads.
+
+Compares the previous path (isoformat per row, jsonable_encoder, stdlib json)
+with ORJSONResponse on native datetimes, for 48-hour, 7-day and 1-year
+hourly series, and reports gzip/brotli payload sizes.
+
+Usage (from backend/):  python scripts/bench_serialization.py
+"""
+from __future__ import annotations
+
+import datetime as dt
+import gzip
+import json
+import math
+import timeit
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+
+SIZES = {"48h": 48, "7d": 24 * 7, "1y": 24 * 365}
+
+
+def _rows(n: int) -> list[dict]:
+    base = dt.datetime(2025, 1, 1)
+    return [
+        {
+            "ts": base + dt.timedelta(hours=i),
+            "yhat": 10.0 * math.sin(i / 24 * 2 * math.pi) + 0.123456,
+            "yhat_lower": 8.5 + i * 1e-3,
+            "yhat_upper": 11.5 + i * 1e-3,
+            "ensemble": True,
+            "model_versions": {"hourly": "lstm_v1+ets_v1"},
+        }
+        for i in range(n)
+    ]
+
+
+def _legacy(rows: list[dict]) -> bytes:
+    out = [{**r, "ts": r["ts"].isoformat()} for r in rows]
+    return json.dumps(
+        jsonable_encoder(out), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _orjson(rows: list[dict]) -> bytes:
+    return orjson.dumps(rows, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _time(fn, rows, number: int) -> float:
+    return min(timeit.repeat(lambda: fn(rows), number=number, repeat=5)) / number * 1e3
+
+
+def main() -> None:
+    header = f"{'payload':>7} {'legacy ms':>10} {'orjson ms':>10} {'speedup':>8} {'raw KB':>8} {'gzip KB':>8} {'br KB':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, n in SIZES.items():
+        rows = _rows(n)
+        number = max(1, 20000 // n)
+        legacy_ms = _time(_legacy, rows, number)
+        fast_ms = _time(_orjson, rows, number)
+        body = _orjson(rows)
+        gz = len(gzip.compress(body, compresslevel=6))
+        br = len(brotli.compress(body, quality=4)) if brotli else float("nan")
+        print(
+            f"{name:>7} {legacy_ms:>10.3f} {fast_ms:>10.3f} {legacy_ms / fast_ms:>7.1f}x "
+            f"{len(body) / 1024:>8.1f} {gz / 1024:>8.1f} {br / 1024:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Minimal local stand-in for the OpenWeather current-weather endpoint.
+
+Serves GET /data/2.5/weather?lat=..&lon=.. with a deterministic payload so
+the collectors can be exercised without an API key or quota. Point the app
+at it with OPENWEATHER_BASE_URL=http://127.0.0.1:<port> (any
+OPENWEATHER_API_KEY value is accepted).
+
+Usage (from backend/):  python scripts/fake_openweather.py [--port 8088] [--latency 0.05] [--error-rate 0]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def payload(lat: float, lon: float) -> dict:
+    seed = int(round(lat * 100)) * 100003 + int(round(lon * 100))
+    rng = random.Random(seed)
+    return {
+        "coord": {"lat": lat, "lon": lon},
+        "weather": [{"id": 800, "main": rng.choice(["Clear", "Clouds", "Rain"]), "description": "", "icon": "01d"}],
+        "main": {
+            "temp": round(rng.uniform(-10, 35), 2),
+            "humidity": rng.randint(20, 100),
+            "pressure": rng.randint(980, 1040),
+        },
+        "wind": {"speed": round(rng.uniform(0, 15), 1), "deg": rng.randint(0, 359)},
+        "dt": int(time.time()),
+        "name": f"Fake {lat:.2f},{lon:.2f}",
+        "cod": 200,
+    }
+
+
+def make_handler(latency: float, error_rate: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            q = parse_qs(url.query)
+            if url.path != "/data/2.5/weather" or "lat" not in q or "lon" not in q:
+                return self._send(404, {"cod": "404", "message": "not found"})
+            if latency:
+                time.sleep(latency)
+            if error_rate and random.random() < error_rate:
+                return self._send(429, {"cod": 429, "message": "rate limited"})
+            try:
+                lat, lon = float(q["lat"][0]), float(q["lon"][0])
+            except ValueError:
+                return self._send(400, {"cod": "400", "message": "wrong latitude"})
+            self._send(200, payload(lat, lon))
+
+        def _send(self, status: int, body: dict) -> None:
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def serve(port: int = 8088, latency: float = 0.0, error_rate: float = 0.0) -> ThreadingHTTPServer:
+    return ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency, error_rate))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8088)
+    ap.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    args = ap.parse_args()
+    srv = serve(args.port, args.latency, args.error_rate)
+    print(f"fake OpenWeather on http://127.0.0.1:{srv.server_port}")
+    srv.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
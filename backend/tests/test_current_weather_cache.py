@@ -0,0 +1,83 @@
+"""Request coalescing and the shared Redis tier of CurrentWeatherCache."""
+from __future__ import annotations
+
+import asyncio
+
+import fakeredis
+
+from app.services.current_weather_cache import CurrentWeatherCache
+
+
+class CountingFetch:
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.calls: list[tuple[float, float, str]] = []
+
+    async def __call__(self, lat: float, lon: float, units: str):
+        self.calls.append((lat, lon, units))
+        await asyncio.sleep(self.delay)
+        return {"coord": {"lat": lat, "lon": lon}, "main": {"temp": 1.0}}
+
+
+def test_concurrent_requests_in_one_cell_make_one_upstream_call():
+    fetch = CountingFetch()
+    cache = CurrentWeatherCache(fetch=fetch, precision=2)
+
+    async def run():
+        # All of these round to (45.51, -73.57)
+        coords = [(45.5101 + i * 1e-5, -73.5699 - i * 1e-5) for i in range(50)]
+        return await asyncio.gather(*(cache.get(lat, lon) for lat, lon in coords))
+
+    results = asyncio.run(run())
+    assert fetch.calls == [(45.51, -73.57, "metric")]
+    assert cache.upstream_calls == 1
+    assert all(r == results[0] for r in results)
+
+
+def test_distinct_cells_and_units_are_fetched_separately():
+    fetch = CountingFetch()
+    cache = CurrentWeatherCache(fetch=fetch, precision=2)
+
+    async def run():
+        await asyncio.gather(
+            cache.get(45.51, -73.57),
+            cache.get(45.52, -73.57),
+            cache.get(45.51, -73.57, "imperial"),
+        )
+
+    asyncio.run(run())
+    assert sorted(fetch.calls) == [
+        (45.51, -73.57, "imperial"),
+        (45.51, -73.57, "metric"),
+        (45.52, -73.57, "metric"),
+    ]
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_fetch():
+    fetch = CountingFetch(delay=0.1)
+    cache = CurrentWeatherCache(fetch=fetch)
+
+    async def run():
+        first = asyncio.ensure_future(cache.get(45.51, -73.57))
+        second = asyncio.ensure_future(cache.get(45.51, -73.57))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run())["coord"] == {"lat": 45.51, "lon": -73.57}
+    assert len(fetch.calls) == 1
+
+
+def test_redis_tier_is_shared_between_processes():
+    server = fakeredis.FakeServer()
+    fetch_a, fetch_b = CountingFetch(), CountingFetch()
+    a = CurrentWeatherCache(fetch=fetch_a, redis_client=fakeredis.FakeRedis(server=server))
+    b = CurrentWeatherCache(fetch=fetch_b, redis_client=fakeredis.FakeRedis(server=server))
+
+    async def run():
+        await a.get(45.51, -73.57)
+        return await b.get(45.5149, -73.5651)
+
+    assert asyncio.run(run())["coord"] == {"lat": 45.51, "lon": -73.57}
+    assert len(fetch_a.calls) == 1
+    assert fetch_b.calls == []
@@ -0,0 +1,48 @@
+"""Cross-process invalidation of ForecastCache through a shared Redis generation."""
+from __future__ import annotations
+
+import fakeredis
+
+from app.services.forecast_cache import ForecastCache
+
+
+def _pair():
+    server = fakeredis.FakeServer()
+    return (
+        ForecastCache(redis_client=fakeredis.FakeRedis(server=server)),
+        ForecastCache(redis_client=fakeredis.FakeRedis(server=server)),
+    )
+
+
+def test_invalidation_in_one_process_makes_the_other_miss():
+    api, worker = _pair()
+    gen, value = api.lookup("45.5,-73.6", "hourly", 24)
+    assert value is None
+    api.set("45.5,-73.6", "hourly", 24, {"rows": [1]}, generation=gen)
+    assert api.lookup("45.5,-73.6", "hourly", 24) == (gen, {"rows": [1]})
+    assert worker.lookup("45.5,-73.6", "hourly", 24) == (gen, {"rows": [1]})
+
+    worker.invalidate("45.5,-73.6", "hourly")
+
+    new_gen, value = api.lookup("45.5,-73.6", "hourly", 24)
+    assert new_gen == gen + 1
+    assert value is None  # the local copy is still cached, but under the old generation
+
+
+def test_late_writer_does_not_publish_a_stale_window():
+    api, worker = _pair()
+    gen, _ = api.lookup("45.5,-73.6", "daily", 7)
+    worker.invalidate("45.5,-73.6", "daily")
+    # Computed from rows read before the invalidation
+    api.set("45.5,-73.6", "daily", 7, {"rows": ["old"]}, generation=gen)
+
+    assert api.lookup("45.5,-73.6", "daily", 7)[1] is None
+    assert worker.lookup("45.5,-73.6", "daily", 7)[1] is None
+
+
+def test_other_horizons_are_untouched():
+    api, worker = _pair()
+    gen, _ = api.lookup("45.5,-73.6", "daily", 7)
+    api.set("45.5,-73.6", "daily", 7, {"rows": [7]}, generation=gen)
+    worker.invalidate("45.5,-73.6", "hourly")
+    assert api.lookup("45.5,-73.6", "daily", 7)[1] == {"rows": [7]}
@@ -0,0 +1,31 @@
+"""Startup import regression checks for the API process (see scripts/bench_import_time.py)."""
+from __future__ import annotations
+
+from pathlib import Path
+import importlib.util
+import os
+
+
+def _bench():
+    path = Path(__file__).resolve().parents[1] / "scripts" / "bench_import_time.py"
+    spec = importlib.util.spec_from_file_location("bench_import_time", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+bench = _bench()
+
+
+def test_heavy_modules_are_not_imported_at_startup():
+    _, _, loaded = bench.import_once((bench.TARGET,))
+    assert loaded == [], f"imported by {bench.TARGET} but should be lazy: {loaded}"
+
+
+def test_startup_import_time_within_budget():
+    budget = float(os.environ.get("IMPORT_TIME_BUDGET_RATIO", bench.DEFAULT_BUDGET_RATIO))
+    result = bench.measure(runs=5)
+    assert result["ratio"] <= budget, (
+        f"{bench.TARGET} took {result['target_ms']:.0f} ms, {result['ratio']:.2f}x the "
+        f"{result['baseline_ms']:.0f} ms baseline (budget {budget:.2f}x)"
+    )
@@ -0,0 +1,116 @@
+"""fetch_many against the local fake OpenWeather server (scripts/fake_openweather.py)."""
+from __future__ import annotations
+
+from pathlib import Path
+import asyncio
+import importlib.util
+import threading
+import time
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services.rate_limit import TokenBucket
+from app.services.weather_collector import fetch_many
+
+
+def _fake_openweather():
+    path = Path(__file__).resolve().parents[1] / "scripts" / "fake_openweather.py"
+    spec = importlib.util.spec_from_file_location("fake_openweather", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+fake = _fake_openweather()
+
+
+class _InFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+        self.total = 0
+
+    def enter(self):
+        with self.lock:
+            self.current += 1
+            self.total += 1
+            self.peak = max(self.peak, self.current)
+
+    def exit(self):
+        with self.lock:
+            self.current -= 1
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Start the fake server on a free port; yields (base_url, in-flight counter)."""
+    monkeypatch.setattr(settings, "OPENWEATHER_API_KEY", "test")
+    inflight = _InFlight()
+    srv = fake.serve(port=0, latency=0.05)
+    handler = srv.RequestHandlerClass
+
+    class Counting(handler):
+        def do_GET(self):
+            inflight.enter()
+            try:
+                super().do_GET()
+            finally:
+                inflight.exit()
+
+    srv.RequestHandlerClass = Counting
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{srv.server_port}", inflight
+    finally:
+        srv.shutdown()
+        srv.server_close()
+
+
+def _run(base_url, locations, *, rate=1000.0, burst=1000, concurrency=10):
+    async def go():
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            start = time.monotonic()
+            result = await fetch_many(
+                locations, client=client, limiter=TokenBucket(rate, burst), concurrency=concurrency
+            )
+            return result, time.monotonic() - start
+
+    return asyncio.run(go())
+
+
+def _locations(n):
+    return [{"lat": 40 + i / 10, "lon": -70 - i / 10, "name": f"loc{i}"} for i in range(n)]
+
+
+def test_concurrency_cap(server):
+    base_url, inflight = server
+    (observations, failures), _ = _run(base_url, _locations(12), concurrency=3)
+    assert failures == []
+    assert len(observations) == 12
+    assert inflight.total == 12
+    assert 1 < inflight.peak <= 3
+
+
+def test_rate_limit(server):
+    base_url, inflight = server
+    rate, burst, n = 40.0, 4, 16
+    (observations, failures), elapsed = _run(base_url, _locations(n), rate=rate, burst=burst, concurrency=n)
+    assert len(observations) == n and failures == []
+    # The burst goes out at once, the rest at ``rate`` per second
+    assert elapsed >= (n - burst) / rate * 0.9
+
+
+def test_failures_are_isolated_per_location(server):
+    base_url, inflight = server
+    locations = _locations(5)
+    locations.insert(2, {"lat": "north", "lon": -70, "name": "bad"})
+    observations, failures = _run(base_url, locations)[0]
+
+    assert [f["name"] for f in failures] == ["bad"]
+    assert "400" in failures[0]["error"]
+    assert sorted(o.location_name for o in observations) == [f"loc{i}" for i in range(5)]
+    assert all(o.temperature is not None for o in observations)